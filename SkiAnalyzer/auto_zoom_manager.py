@@ -1,6 +1,8 @@
 import math
 
 class Rect:
+    __slots__ = ('left', 'top', 'right', 'bottom')
+
     def __init__(self, left, top, right, bottom):
         self.left = left
         self.top = top
@@ -66,15 +68,16 @@ class SmoothingFilter:
 
 
 class AutoZoomManager:
-    def __init__(self):
+    def __init__(self, target_subject_height_ratio=0.15, k_zoom=10.0, smoothing_alpha=0.2, intent_alpha=0.05,
+                 min_zoom_scale=0.05, max_zoom_scale=1.0):
         # Components
-        self.height_smoother = SmoothingFilter(alpha=0.2)
-        self.center_x_smoother = SmoothingFilter(alpha=0.2)
-        self.center_y_smoother = SmoothingFilter(alpha=0.2)
+        self.height_smoother = SmoothingFilter(alpha=smoothing_alpha)
+        self.center_x_smoother = SmoothingFilter(alpha=smoothing_alpha)
+        self.center_y_smoother = SmoothingFilter(alpha=smoothing_alpha)
 
         # "Sticky Framing" Intent Detectors
-        self.target_framing_x_intent = SmoothingFilter(alpha=0.05)
-        self.target_framing_y_intent = SmoothingFilter(alpha=0.05)
+        self.target_framing_x_intent = SmoothingFilter(alpha=intent_alpha)
+        self.target_framing_y_intent = SmoothingFilter(alpha=intent_alpha)
 
         self.pan_x_pid = PIDController(kp=1.0, kd=0.5)
         self.pan_y_pid = PIDController(kp=1.0, kd=0.5)
@@ -85,7 +88,10 @@ class AutoZoomManager:
         self.current_crop_center_y = 0.5
 
         # Configuration
-        self.target_subject_height_ratio = 0.15 # Reduced from 0.25 to 0.15 to reduce zoom level
+        self.target_subject_height_ratio = target_subject_height_ratio # Reduced from 0.25 to 0.15 to reduce zoom level
+        self.k_zoom = k_zoom
+        self.min_zoom_scale = min_zoom_scale # 0.05 = 20x Zoom
+        self.max_zoom_scale = max_zoom_scale # 1.0 = Full Frame
         self.max_zoom_speed = 5.0
         self.max_pan_speed = 5.0
 
@@ -110,14 +116,14 @@ class AutoZoomManager:
         zoom_error = self.target_subject_height_ratio - current_skier_height_in_crop
 
         # Gain
-        k_zoom = 10.0
+        k_zoom = self.k_zoom
 
         # Error > 0 (Too small/far) -> Decrease Scale (Zoom In)
         scale_change = -zoom_error * k_zoom * dt
         self.current_zoom_scale += scale_change
 
         # Clamp Scale (0.1 = 10x Zoom, 1.0 = 1x Zoom)
-        self.current_zoom_scale = max(0.05, min(1.0, self.current_zoom_scale))
+        self.current_zoom_scale = max(self.min_zoom_scale, min(self.max_zoom_scale, self.current_zoom_scale))
 
         # 4. Pan Logic (Proportional Panning)
         # Direct Mapping: Crop Center = Skier Center (Smoothed)
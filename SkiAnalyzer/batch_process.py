@@ -0,0 +1,206 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cli_options import detector_options, parse_output_size
+from util import video_signature
+
+# Batch processing: many input videos across a process pool. Each worker loads
+# YOLO (and the pose estimator) once and reuses them for every video it gets.
+# Per-file status lives in a JSON manifest in the output directory, rewritten after
+# every finished file, so an interrupted batch resumes where it stopped.
+# Outputs keep each input's path relative to the inputs' common directory, so
+# same-named videos from different folders do not overwrite each other.
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.mkv')
+MANIFEST_NAME = 'manifest.json'
+
+
+def find_videos(inputs):
+    # Directories (non-recursive), globs and plain paths -> sorted unique video paths
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item) or [item]
+        for path in candidates:
+            base = os.path.splitext(os.path.basename(path))[0]
+            if (os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS)
+                    and not base.endswith('_processed')):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def output_paths(videos, output_dir):
+    # {video: output path}: <output_dir>/<path relative to the common input dir>/<name>_processed.mp4
+    root = os.path.commonpath([os.path.dirname(v) for v in videos]) if videos else ''
+    outputs = {}
+    for video in videos:
+        relative = os.path.relpath(os.path.dirname(video), root)
+        base = os.path.splitext(os.path.basename(video))[0]
+        outputs[video] = os.path.normpath(os.path.join(output_dir, relative, f"{base}_processed.mp4"))
+    return outputs
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.isfile(path):
+            with open(path) as f:
+                self.entries = json.load(f).get('files', {})
+
+    def is_done(self, video_path):
+        entry = self.entries.get(video_path)
+        return (entry is not None and entry.get('status') == 'done'
+                and entry.get('input') == video_signature(video_path)
+                and os.path.isfile(entry.get('output', '')))
+
+    def update(self, video_path, **fields):
+        self.entries.setdefault(video_path, {}).update(fields)
+        self.save()
+
+    def save(self):
+        # Write then rename, so an interrupted batch never leaves a truncated manifest
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+# Worker state: models loaded once per process
+_worker = None
+
+
+def _init_worker(options, threads):
+    global _worker
+    import cv2
+    cv2.setNumThreads(threads)
+    # x264 gets the same per-worker share of the cores as cv2 and torch
+    options = dict(options, encoder_options=dict(options.get('encoder_options') or {}, threads=threads))
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from detectors import create_detector
+    from pose_estimator import PoseEstimator
+    # With a cache dir, replayed videos never need YOLO; load it on the first miss instead
+    detector = None
+    if not options.get('cache_dir'):
+        detector = create_detector(options.get('detector_name', 'yolov8n'), **(options.get('detector_options') or {}))
+    pose = None
+    if options.get('enable_skeleton'):
+        pose = PoseEstimator(min_subject_height=options.get('pose_min_height', 0),
+                             interval=options.get('pose_interval', 1),
+                             smoothing_alpha=options.get('pose_smoothing', 1.0))
+    _worker = {'options': options, 'detector': detector, 'pose': pose}
+
+
+def _process_one(video_path, output_path):
+    from video_processor import VideoProcessor
+    start = time.perf_counter()
+    processor = VideoProcessor(video_path, output_path, detector=_worker['detector'],
+                               pose_estimator=_worker['pose'], **_worker['options'])
+    processor.process()
+    if processor.frame_idx == 0 or not os.path.isfile(output_path):
+        raise RuntimeError("no frames decoded or no output written")
+    # Keep a detector that was loaded lazily for the next video
+    _worker['detector'] = processor.yolo
+    return {'frames': processor.frame_idx, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def run_batch(videos, output_dir, workers=None, options=None):
+    # Returns the manifest entries of this batch
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    jobs = []
+    outputs = output_paths(videos, output_dir)
+    for video in videos:
+        if manifest.is_done(video):
+            print(f"Skipping (done): {video}")
+            continue
+        output = outputs[video]
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        manifest.entries[video] = {'status': 'pending', 'output': output, 'input': video_signature(video)}
+        jobs.append((video, output))
+    manifest.save()
+    print(f"Videos: {len(videos)} | To process: {len(jobs)} | Workers: {workers}")
+    if not jobs:
+        return manifest.entries
+
+    start = time.perf_counter()
+    total_frames = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options or {}, threads)) as pool:
+        futures = {pool.submit(_process_one, video, output): video for video, output in jobs}
+        for video in futures.values():
+            manifest.entries[video]['status'] = 'running'
+        manifest.save()
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                manifest.update(video, status='failed', error=f"{type(e).__name__}: {e}")
+                print(f"Failed: {video}: {e}")
+                continue
+            total_frames += result['frames']
+            manifest.update(video, status='done', error=None, **result)
+            print(f"Done: {video} ({result['frames']} frames, {result['seconds']:.1f}s)")
+
+    elapsed = time.perf_counter() - start
+    print(f"Batch: {total_frames} frames in {elapsed:.1f}s ({total_frames / elapsed if elapsed > 0 else 0.0:.1f} fps aggregate)")
+    return manifest.entries
+
+
+def main():
+    from detectors import tracking_detectors
+    parser = argparse.ArgumentParser(description='Ski Video Analyzer: process many videos across a worker pool')
+    parser.add_argument('inputs', nargs='+', help='Video files, directories or glob patterns')
+    parser.add_argument('--output-dir', required=True, help='Where processed videos and manifest.json go')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on zoomed subject')
+    parser.add_argument('--pose-min-height', type=int, default=0, help='Run pose only while the subject is at least this many output pixels tall')
+    parser.add_argument('--pose-interval', type=int, default=1, help='Run pose every N frames, landmarks follow the subject box in between')
+    parser.add_argument('--pose-smoothing', type=float, default=1.0, help='EMA weight of a new pose result (1 = no smoothing)')
+    parser.add_argument('--detector', choices=tracking_detectors(), default='yolov8n', help='Detector backend (ONNX backends need exported weights, see export_detector.py)')
+    parser.add_argument('--model', help='Detector weights (default: the backend\'s yolov8n file in the working directory)')
+    parser.add_argument('--detector-threads', type=int, default=1, help='Detector CPU threads per worker (0 = library default)')
+    parser.add_argument('--cache-dir', help='Detection cache directory: reuse cached detections, or record them on first run')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay')
+    parser.add_argument('--encoder', choices=['ffmpeg', 'cv2'], default='ffmpeg')
+    parser.add_argument('--preset', default='veryfast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor')
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        parser.error("No input videos found")
+
+    options = {
+        'enable_skeleton': args.skeleton,
+        'pose_min_height': args.pose_min_height,
+        'pose_interval': args.pose_interval,
+        'pose_smoothing': args.pose_smoothing,
+        'detector_name': args.detector,
+        'detector_options': detector_options(args),
+        'cache_dir': os.path.abspath(args.cache_dir) if args.cache_dir else None,
+        'output_size': parse_output_size(parser, args.output_size),
+        'debug_overlay': not args.no_overlay,
+        'encoder': args.encoder,
+        # Encoder threads are set per worker (see _init_worker)
+        'encoder_options': {'preset': args.preset, 'crf': args.crf},
+    }
+    run_batch(videos, os.path.abspath(args.output_dir), workers=args.workers, options=options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import pickle
+import shutil
+import time
+
+import cv2
+
+from detectors import detector_config
+from util import video_signature
+from video_writer import concat_segments, find_ffmpeg, open_writer
+
+# Checkpoint/resume for long VideoProcessor runs. The output is written in parts and
+# every checkpoint finalizes one, so a checkpoint at frame B is
+#   - the finalized parts holding frames [0, B)
+#   - the detect-side state after frame B - 1: ByteTrack (tracks, Kalman states, next
+#     ID), target track, last target box, stride/motion
+#   - the render-side state after frame B - 1: AutoZoom smoothers, PID, zoom scale and
+#     center, pose landmarks
+#   - recorded detection-cache frames [0, B), in one chunk file per checkpoint
+# Pipeline stages run ahead of the writer, so each side snapshots itself (pickled, i.e.
+# copied) when it finishes frame B - 1 and the checkpoint is saved once the writer has
+# written that frame. A restarted job with the same input and settings seeks to B and
+# continues; when it completes the parts are joined by stream copy (with the source
+# audio) and the checkpoint directory is removed.
+# Frames come out as in an uninterrupted run, except with the pose overlay: MediaPipe's
+# internal tracking restarts after a resume.
+
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+
+def job_fingerprint(processor):
+    # Input and every setting that changes the output frames. The input is identified by
+    # path, size and mtime: hashing hours of video on every start would cost minutes.
+    pose = processor.pose
+    return {
+        'input': os.path.abspath(processor.input_path), **video_signature(processor.input_path),
+        'detector': detector_config(processor.detector_name, roi=processor.roi, **processor.detector_options),
+        'max_stride': processor.max_stride, 'batch_size': processor.batch_size,
+        'output_size': [processor.target_width, processor.target_height], 'debug_overlay': processor.debug_overlay,
+        'pose': [pose.min_subject_height, pose.interval, pose.smoothing_alpha] if processor.enable_skeleton and pose else None,
+        'encoder': processor.encoder, 'encoder_options': processor.encoder_options,
+    }
+
+
+def seek_frame(cap, frame):
+    # Position cap so the next read returns frame; falls back to decoding forward when
+    # the container cannot seek frame-accurately
+    if frame == 0:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame):
+        if not cap.grab():
+            raise RuntimeError(f"Cannot seek to frame {frame}: the video is shorter")
+
+
+class PartWriter:
+    # Writer interface over numbered parts in one directory. A part is opened on its
+    # first frame; rotate() finalizes it, so the next frame starts a new one.
+    def __init__(self, directory, fps, size, backend, options, parts=(), frames=0):
+        self.directory = directory
+        self.fps = fps
+        self.size = size
+        self.backend = backend
+        self.options = options
+        self.parts = list(parts)
+        # Frames written in total, resumed parts included
+        self.frames = frames
+        self.writer = None
+
+    def _part_path(self):
+        return os.path.join(self.directory, f"part_{len(self.parts):05d}.mp4")
+
+    def write(self, frame):
+        if self.writer is None:
+            self.writer = open_writer(self._part_path(), self.fps, self.size, backend=self.backend, **self.options)
+        self.writer.write(frame)
+        self.frames += 1
+
+    def rotate(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            self.parts.append(self._part_path())
+
+    def release(self):
+        # Only parts listed in the saved checkpoint count on resume: one finalized
+        # after the last checkpoint (crash, interrupt) is simply overwritten
+        self.rotate()
+
+
+class Checkpointer:
+    def __init__(self, directory, interval_frames, fingerprint):
+        if find_ffmpeg() is None:
+            raise RuntimeError("Checkpointing joins output parts with ffmpeg (install it or set FFMPEG_BINARY)")
+        self.directory = directory
+        self.interval = max(1, int(interval_frames))
+        self.fingerprint = fingerprint
+        self.path = os.path.join(directory, 'checkpoint.pkl')
+        self.next_boundary = self.interval
+        self.chunks = []
+        self._detect = {}
+        self._render = {}
+        # Stats
+        self.saved = 0
+        self.save_time = 0.0
+
+    def resume(self, processor, cap):
+        # Restore the last checkpoint of this job into processor and cap; returns the
+        # frame to continue from (0 when starting over) and the parts written so far
+        state = None
+        if os.path.isfile(self.path):
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != CHECKPOINT_VERSION or state.get('fingerprint') != self.fingerprint:
+                print(f"Checkpoint in {self.directory} is for another input or settings: starting over")
+                state = None
+        if state is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+            return 0, []
+
+        frame = state['frame']
+        seek_frame(cap, frame)
+        processor.load_detect_state(pickle.loads(state['detect']))
+        processor.load_render_state(pickle.loads(state['render']))
+        self.chunks = state['chunks']
+        if processor.record_cache:
+            for chunk in self.chunks:
+                with open(os.path.join(self.directory, chunk), 'rb') as f:
+                    for candidates in pickle.load(f):
+                        processor.detection_cache.append(candidates)
+        self.next_boundary = frame + self.interval
+        print(f"Resuming from checkpoint at frame {frame}")
+        return frame, state['parts']
+
+    def detected(self, processor):
+        # Detect side, after each frame (batch): snapshot once a boundary is reached
+        if processor.detect_idx >= self.next_boundary:
+            self._detect[processor.detect_idx] = pickle.dumps(processor.detect_state())
+            self.next_boundary = processor.detect_idx + self.interval
+
+    def rendered(self, processor):
+        # Render side, after each frame
+        if processor.frame_idx in self._detect:
+            self._render[processor.frame_idx] = pickle.dumps(processor.render_state())
+
+    def written(self, processor, out):
+        # Writer side, after each frame: the checkpoint is complete once its frame is out
+        frame = out.frames
+        if frame not in self._render:
+            return
+        start = time.perf_counter()
+        out.rotate()
+        if processor.record_cache:
+            chunk = f"detections_{frame:09d}.pkl"
+            self._dump(chunk, [processor.detection_cache[i] for i in range(self._chunk_start(), frame)])
+            self.chunks.append(chunk)
+        state = {'version': CHECKPOINT_VERSION, 'fingerprint': self.fingerprint, 'frame': frame,
+                 'parts': out.parts, 'chunks': self.chunks,
+                 'detect': self._detect.pop(frame), 'render': self._render.pop(frame)}
+        self._dump('checkpoint.pkl', state)
+        self.saved += 1
+        self.save_time += time.perf_counter() - start
+
+    def _chunk_start(self):
+        # Chunk files are named after the frame they end at
+        return int(self.chunks[-1][len('detections_'):-len('.pkl')]) if self.chunks else 0
+
+    def _dump(self, name, obj):
+        # Write then rename: a crash mid-save leaves the previous checkpoint intact
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def finish(self, out, output_path, audio_source):
+        # Join all parts into the output (after out.release()) and drop the checkpoint
+        concat_segments(out.parts, output_path, audio_source=audio_source)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def summary(self):
+        return f"Checkpoints: {self.saved} saved, {self.save_time * 1000:.0f} ms in total"
@@ -0,0 +1,24 @@
+import os
+
+# Option parsing shared by the command line tools.
+
+
+def parse_output_size(parser, text):
+    # --output-size 'WIDTHxHEIGHT' -> (width, height), None when not given. Checked up
+    # front: a bad value would otherwise fail deep inside the run (or in every worker).
+    if not text:
+        return None
+    try:
+        size = tuple(int(v) for v in text.lower().split('x'))
+    except ValueError:
+        size = ()
+    if len(size) != 2 or min(size) <= 0:
+        parser.error(f"--output-size must look like 1920x1080, got {text!r}")
+    return size
+
+
+def detector_options(args):
+    # --model and --detector-threads -> create_detector keyword arguments. The model
+    # path is made absolute: workers and the model server may run in another directory.
+    model = os.path.abspath(args.model) if args.model else None
+    return {k: v for k, v in (('model_name', model), ('threads', args.detector_threads)) if v}
@@ -0,0 +1,74 @@
+import json
+import os
+
+import numpy as np
+
+from auto_zoom_manager import Rect
+
+# Per-frame render inputs of one processed video: the crop AutoZoom chose, the subject
+# box, the subject height in the crop and the target track. A run records it
+# (VideoProcessor trajectory_path, segment_process.py --trajectory). With it any frame
+# range renders exactly as in that run without detecting or replaying AutoZoom from
+# frame 0, so it can seek straight to the range (render_segment.py).
+
+TRAJECTORY_VERSION = 1
+
+# Row layout: crop l, t, r, b | subject box l, t, r, b (NaN without a detection) | height | track ID
+_COLUMNS = 10
+
+
+class CropTrajectory:
+    def __init__(self, width, height, fps, source=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        # video_signature() of the source, checked before rendering from the trajectory
+        self.source = source or {}
+        self._rows = []
+        self.rows = None
+
+    def append(self, crop_rect, detected_rect, h_crop, track_id):
+        box = (detected_rect.left, detected_rect.top, detected_rect.right, detected_rect.bottom) if detected_rect else (np.nan,) * 4
+        self._rows.append((crop_rect.left, crop_rect.top, crop_rect.right, crop_rect.bottom) + box +
+                          (h_crop, -1 if track_id is None else track_id))
+
+    def __len__(self):
+        return len(self.rows) if self.rows is not None else len(self._rows)
+
+    def __getitem__(self, frame_idx):
+        # render_frame arguments of one frame: crop Rect, subject Rect or None, height, track ID or None
+        row = self.rows[frame_idx] if self.rows is not None else self._rows[frame_idx]
+        detected = None if np.isnan(row[4]) else Rect(*row[4:8])
+        track_id = int(row[9])
+        return Rect(*row[0:4]), detected, float(row[8]), None if track_id < 0 else track_id
+
+    @classmethod
+    def from_arrays(cls, width, height, fps, crops, boxes, valid, heights, track_ids, source=None):
+        trajectory = cls(width, height, fps, source)
+        rows = np.empty((len(crops), _COLUMNS))
+        rows[:, 0:4] = crops
+        rows[:, 4:8] = np.where(np.asarray(valid)[:, None], boxes, np.nan)
+        rows[:, 8] = np.where(valid, np.nan_to_num(heights), 0.0)
+        rows[:, 9] = track_ids
+        trajectory.rows = rows
+        return trajectory
+
+    def save(self, path):
+        rows = self.rows if self.rows is not None else np.array(self._rows, dtype=np.float64).reshape(-1, _COLUMNS)
+        meta = {'version': TRAJECTORY_VERSION, 'width': self.width, 'height': self.height, 'fps': self.fps,
+                'source': self.source}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Write then rename so an interrupted run never leaves a truncated trajectory behind
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, rows=rows, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != TRAJECTORY_VERSION:
+                raise ValueError(f"Unsupported crop trajectory version in {path}")
+            trajectory = cls(meta['width'], meta['height'], meta['fps'], meta['source'])
+            trajectory.rows = data['rows']
+        return trajectory
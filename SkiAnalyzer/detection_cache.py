@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from detectors import make_candidates, no_candidates
+
+CACHE_VERSION = 1
+
+
+def hash_video(path, chunk_size=1 << 20):
+    # Content hash, so renamed/copied clips still hit the cache and edited ones miss it
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(video_path, detector_config):
+    payload = json.dumps({'video': hash_video(video_path), 'detector': detector_config, 'version': CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class DetectionCache:
+    # Every raw tracker candidate for every frame of one video. On disk the
+    # candidates are flat column arrays plus per-frame offsets:
+    #   boxes (N, 4) float32 xyxy source pixels, conf (N,) float32,
+    #   cls (N,) int16, track_id (N,) int32 (-1 = no confirmed track),
+    #   offsets (frames + 1,) int64 -> candidates of frame i are [offsets[i], offsets[i + 1])
+    # In memory they are one CANDIDATE_DTYPE array, so a frame is a zero-copy slice.
+    def __init__(self, width, height, fps, detector_config=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.detector_config = detector_config or {}
+        self._frames = []
+        self.candidates = None
+        self.offsets = None
+
+    @staticmethod
+    def path_for(cache_dir, video_path, detector_config):
+        return os.path.join(cache_dir, f"{cache_key(video_path, detector_config)}.npz")
+
+    def append(self, candidates):
+        self._frames.append(candidates)
+
+    def __len__(self):
+        if self.offsets is not None:
+            return len(self.offsets) - 1
+        return len(self._frames)
+
+    def __getitem__(self, frame_idx):
+        # Candidates of one frame in the same array form YOLOv8Detector.track returns
+        if self.offsets is None:
+            return self._frames[frame_idx]
+        return self.candidates[self.offsets[frame_idx]:self.offsets[frame_idx + 1]]
+
+    def save(self, path):
+        candidates = np.concatenate(self._frames) if self._frames else no_candidates()
+        offsets = np.zeros(len(self._frames) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in self._frames], out=offsets[1:])
+        meta = {'version': CACHE_VERSION, 'width': self.width, 'height': self.height, 'fps': self.fps,
+                'detector': self.detector_config}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Write then rename so an interrupted run never leaves a truncated cache behind
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, boxes=candidates['xyxy'], conf=candidates['conf'], cls=candidates['cls'],
+                            track_id=candidates['track_id'], offsets=offsets, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != CACHE_VERSION:
+                raise ValueError(f"Unsupported detection cache version in {path}")
+            cache = cls(meta['width'], meta['height'], meta['fps'], meta.get('detector'))
+            cache.candidates = make_candidates(data['boxes'], data['conf'], data['cls'], data['track_id'])
+            cache.offsets = data['offsets']
+        return cache
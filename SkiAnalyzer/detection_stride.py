@@ -0,0 +1,175 @@
+import argparse
+
+import numpy as np
+
+from auto_zoom_manager import Rect
+
+# Adaptive detection stride: the detector only runs on keyframes, the subject box
+# in between is extrapolated with a constant-velocity model. After every keyframe
+# the stride is adapted from how wrong the prediction was (residual) and how fast
+# the subject moves: shorter when either rises, longer while the skier is stable.
+
+
+class ConstantVelocityPredictor:
+    # Box state is normalized (left, top, right, bottom) at the last keyframe plus
+    # a velocity per second; predictions extrapolate from the last keyframe.
+    def __init__(self, velocity_alpha=0.5):
+        self.velocity_alpha = velocity_alpha
+        self.box = None
+        self.velocity = [0.0, 0.0, 0.0, 0.0]
+        self.elapsed = 0.0
+
+    def reset(self):
+        self.box = None
+        self.velocity = [0.0, 0.0, 0.0, 0.0]
+        self.elapsed = 0.0
+
+    def predict(self, dt):
+        # Box for the next (non-key) frame, None until the first detection
+        self.elapsed += dt
+        if self.box is None:
+            return None
+        t = self.elapsed
+        return Rect(*[b + v * t for b, v in zip(self.box, self.velocity)])
+
+    def correct(self, rect, dt):
+        # Feed a keyframe detection; returns the prediction residual in subject
+        # heights (0.0 for the first detection, None when the subject is lost)
+        elapsed = self.elapsed + dt
+        if rect is None:
+            self.reset()
+            return None
+        measured = (rect.left, rect.top, rect.right, rect.bottom)
+        if self.box is None:
+            self.box = measured
+            self.elapsed = 0.0
+            return 0.0
+
+        predicted = [b + v * elapsed for b, v in zip(self.box, self.velocity)]
+        residual = max(abs(p - m) for p, m in zip(predicted, measured)) / max(rect.height, 1e-6)
+        if elapsed > 0:
+            a = self.velocity_alpha
+            self.velocity = [a * (m - b) / elapsed + (1.0 - a) * v
+                             for m, b, v in zip(measured, self.box, self.velocity)]
+        self.box = measured
+        self.elapsed = 0.0
+        return residual
+
+    @property
+    def speed(self):
+        # Center speed in subject heights per second
+        if self.box is None:
+            return 0.0
+        vx = (self.velocity[0] + self.velocity[2]) / 2.0
+        vy = (self.velocity[1] + self.velocity[3]) / 2.0
+        return float(np.hypot(vx, vy)) / max(self.box[3] - self.box[1], 1e-6)
+
+
+class AdaptiveStride:
+    def __init__(self, min_stride=1, max_stride=8, low_residual=0.05, high_residual=0.2, high_speed=2.0):
+        self.min_stride = max(1, min_stride)
+        self.max_stride = max(self.min_stride, max_stride)
+        self.low_residual = low_residual
+        self.high_residual = high_residual
+        self.high_speed = high_speed
+        self.stride = self.min_stride
+        self.until_keyframe = 0
+
+        # Stats
+        self.frames = 0
+        self.keyframes = 0
+
+    def next_frame(self):
+        # True when the detector has to run on this frame
+        self.frames += 1
+        if self.until_keyframe <= 0:
+            self.keyframes += 1
+            return True
+        self.until_keyframe -= 1
+        return False
+
+    def update(self, residual, speed):
+        # Adapt after a keyframe
+        if residual is None:
+            # Lost the subject: detect every frame until it is re-acquired
+            self.stride = self.min_stride
+        elif residual > self.high_residual or speed > self.high_speed:
+            self.stride = max(self.min_stride, self.stride // 2)
+        elif residual < self.low_residual:
+            self.stride = min(self.max_stride, self.stride + 1)
+        self.until_keyframe = self.stride - 1
+
+    def summary(self, dt):
+        duration = self.frames * dt
+        dps = self.keyframes / duration if duration > 0 else 0.0
+        ratio = self.keyframes / self.frames if self.frames else 0.0
+        return f"Detections: {self.keyframes}/{self.frames} frames ({ratio * 100:.1f}%, {dps:.1f} per video second)"
+
+
+def strided_boxes(boxes, valid, dt, **stride_args):
+    # Simulate stride mode over every-frame boxes: keyframes see the detection,
+    # other frames get the prediction. Returns boxes, valid and the AdaptiveStride (stats).
+    predictor = ConstantVelocityPredictor()
+    stride = AdaptiveStride(**stride_args)
+    out = np.zeros_like(boxes)
+    out_valid = np.zeros_like(valid)
+    for i in range(len(boxes)):
+        if stride.next_frame():
+            rect = Rect(*boxes[i]) if valid[i] else None
+            stride.update(predictor.correct(rect, dt), predictor.speed)
+        else:
+            rect = predictor.predict(dt)
+        if rect is not None:
+            out[i] = rect.left, rect.top, rect.right, rect.bottom
+            out_valid[i] = True
+    return out, out_valid, stride
+
+
+def evaluate_stride(boxes, valid, dt, **stride_args):
+    # Stride mode vs every-frame detection on the same clip: detection rate,
+    # box error and framing metrics, all measured against the every-frame boxes
+    from zoom_sweep import score_trajectory
+    from zoom_trajectory import DEFAULT_PARAMS, solve_trajectory
+
+    pred, pred_valid, stride = strided_boxes(boxes, valid, dt, **stride_args)
+    both = valid & pred_valid
+    heights = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    box_error = np.abs(pred - boxes).max(axis=1) / heights
+
+    target = DEFAULT_PARAMS['target_subject_height_ratio']
+    reference = score_trajectory(solve_trajectory(boxes, valid, dt), boxes, valid, dt, target)
+    strided = score_trajectory(solve_trajectory(pred, pred_valid, dt), boxes, valid, dt, target)
+    duration = len(boxes) * dt
+    return {
+        'frames': len(boxes),
+        'keyframes': stride.keyframes,
+        'detections_per_second': stride.keyframes / duration if duration > 0 else 0.0,
+        'every_frame_detections_per_second': 1.0 / dt,
+        'box_error': float(box_error[both].mean()) if both.any() else 0.0,
+        'reference': {k: float(v) for k, v in reference.items()},
+        'strided': {k: float(v) for k, v in strided.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adaptive detection stride vs every-frame detection on a detection cache')
+    parser.add_argument('cache', help='Detection cache (.npz) recorded with --cache-dir / --detect-only')
+    parser.add_argument('--min-stride', type=int, default=1)
+    parser.add_argument('--max-stride', type=int, default=8)
+    args = parser.parse_args()
+
+    from detection_cache import DetectionCache
+    from zoom_sweep import detection_boxes
+    cache = DetectionCache.load(args.cache)
+    boxes, valid = detection_boxes(cache)
+    dt = 1.0 / cache.fps if cache.fps > 0 else 1.0 / 30.0
+
+    report = evaluate_stride(boxes, valid, dt, min_stride=args.min_stride, max_stride=args.max_stride)
+    print(f"Frames: {report['frames']} | Keyframes: {report['keyframes']}")
+    print(f"Detections/s: {report['detections_per_second']:.1f} (every frame: {report['every_frame_detections_per_second']:.1f})")
+    print(f"Predicted box error: {report['box_error']:.3f} subject heights")
+    for name in report['reference']:
+        print(f"{name}: every frame {report['reference'][name]:.4f} | strided {report['strided'][name]:.4f}")
+
+if __name__ == "__main__":
+    main()
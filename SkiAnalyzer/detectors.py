@@ -1,79 +1,464 @@
+import os
+
 import cv2
 import numpy as np
 from auto_zoom_manager import Rect
 
+DEFAULT_CONFIDENCE_THRESHOLD = 0.3
+PERSON_CLASS_ID = 0
+
+# ---------- Candidate selection ----------
+# Candidates of one frame are a structured array in source pixels, one row per box;
+# track_id is -1 when ByteTrack has not confirmed the box yet.
+# Selection only depends on the candidates and the current target, so it can be
+# replayed from a detection cache without running the model.
+CANDIDATE_DTYPE = np.dtype([('xyxy', np.float32, (4,)), ('conf', np.float32), ('cls', np.int16), ('track_id', np.int32)])
+NO_TRACK_ID = -1
+
+def make_candidates(xyxy, conf, cls, track_id=None):
+    # Build a candidate array from column arrays (track_id None = no confirmed tracks)
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    candidates = np.empty(len(xyxy), dtype=CANDIDATE_DTYPE)
+    candidates['xyxy'] = xyxy
+    candidates['conf'] = conf
+    candidates['cls'] = cls
+    candidates['track_id'] = NO_TRACK_ID if track_id is None else track_id
+    return candidates
+
+def no_candidates():
+    return np.empty(0, dtype=CANDIDATE_DTYPE)
+
+def select_candidate(candidates, target_track_id, width, height,
+                     confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, class_id=PERSON_CLASS_ID):
+    # Filter for class 0 (person)
+    candidates = candidates[(candidates['cls'] == class_id) & (candidates['conf'] >= confidence_threshold)]
+    if len(candidates) == 0:
+        return None, None
+
+    # Selection Logic
+    selected = None
+
+    if target_track_id is not None:
+         # 1. Try to find the specific track ID
+         match = np.flatnonzero(candidates['track_id'] == target_track_id)
+         if len(match):
+             selected = candidates[match[0]]
+
+    if selected is None:
+         # 2. Fallback: Find closest to center (Initial acquisition or recovery)
+         # Note: If target_track_id was set but not found, we effectively 'lost' and re-acquire
+         # or we could return None, None to indicate loss.
+         # Let's return best candidate (closest to center) and let the caller decide if it wants to switch.
+         # Actually, for "Recovery", simpler is picking closest to center.
+         xyxy = candidates['xyxy'].astype(np.float64)
+         cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+         cy = (xyxy[:, 1] + xyxy[:, 3]) / 2
+         dist = (cx - width / 2) ** 2 + (cy - height / 2) ** 2
+         selected = candidates[np.argmin(dist)]
+
+    x1, y1, x2, y2 = selected['xyxy'].tolist()
+    track_id = int(selected['track_id'])
+
+    # Convert to normalized Rect (top‑left origin)
+    left = x1 / width
+    top = y1 / height
+    right = x2 / width
+    bottom = y2 / height
+    return Rect(left, top, right, bottom), (track_id if track_id != NO_TRACK_ID else None)
+
+def select_track(candidates, track_id, width, height,
+                 confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, class_id=PERSON_CLASS_ID):
+    # Normalized Rect of one track, None when it is not in this frame. Unlike
+    # select_candidate there is no fallback to another person.
+    match = np.flatnonzero((candidates['track_id'] == track_id) & (candidates['cls'] == class_id) &
+                           (candidates['conf'] >= confidence_threshold))
+    if len(match) == 0:
+        return None
+    x1, y1, x2, y2 = candidates['xyxy'][match[0]].tolist()
+    return Rect(x1 / width, y1 / height, x2 / width, y2 / height)
+
+def box_iou(xyxy, box):
+    # IoU of each (N, 4) x1, y1, x2, y2 row with one box
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    iw = np.clip(np.minimum(xyxy[:, 2], box[2]) - np.maximum(xyxy[:, 0], box[0]), 0, None)
+    ih = np.clip(np.minimum(xyxy[:, 3], box[3]) - np.maximum(xyxy[:, 1], box[1]), 0, None)
+    inter = iw * ih
+    union = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1]) + (box[2] - box[0]) * (box[3] - box[1]) - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
 # ---------- YOLOv8 Detector ----------
 class YOLOv8Detector:
-    def __init__(self, model_name='yolov8n.pt'):
+    DEFAULT_MODEL = 'yolov8n.pt'
+    TRACKER = 'bytetrack.yaml'
+
+    # ROI mode: window side in subject heights, smallest window in source pixels,
+    # edge margin as a fraction of the window, min IoU with the last target box to
+    # accept a window pass, and a full-frame pass at least every ROI_REFRESH frames
+    # so skiers outside the window get (and keep) tracks
+    ROI_SCALE = 4.0
+    ROI_MIN_SIZE = 320
+    ROI_EDGE_MARGIN = 0.1
+    ROI_MIN_IOU = 0.2
+    ROI_REFRESH = 30
+
+    # Ultralytics defaults: predict() conf, track() conf, NMS IoU, max detections.
+    # Tracking runs at the low track() conf: ByteTrack's second association pass
+    # matches tracks against those low-score boxes.
+    PREDICT_CONF = 0.25
+    TRACK_CONF = 0.1
+    NMS_IOU = 0.7
+    MAX_DET = 300
+
+    def __init__(self, model_name=DEFAULT_MODEL, threads=0):
+        # A local file only: Ultralytics would otherwise try to download missing weights
+        if not os.path.isfile(model_name):
+            raise FileNotFoundError(f"YOLO weights not found: {model_name} (place {self.DEFAULT_MODEL} in the working directory or pass --model)")
         from ultralytics import YOLO
-        # This will download the model if not present
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model_name = model_name
         self.model = YOLO(model_name)
         # YOLO expects BGR images; we will pass frames directly
-        self.confidence_threshold = 0.3
+        self.confidence_threshold = DEFAULT_CONFIDENCE_THRESHOLD
+        self.person_class_id = PERSON_CLASS_ID
 
-    def detect(self, frame, target_track_id=None):
+        # ROI stats
+        self.roi_passes = 0
+        self.full_passes = 0
+        self._since_full = 0
+
+        # Tracker for track_batch (model.track keeps its own)
+        self.batch_tracker = None
+
+    def reset(self):
+        # Forget all tracks, e.g. before reusing the loaded model on another video
+        predictor = getattr(self.model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
+        self.batch_tracker = None
+        self.roi_passes = 0
+        self.full_passes = 0
+        self._since_full = 0
+
+    def tracker_state(self):
+        # ByteTrack state between frames (tracks with their Kalman states, next track
+        # ID), picklable: a detector that loads it continues the same tracks
+        predictor = getattr(self.model, 'predictor', None)
+        return self._state(getattr(predictor, 'trackers', None))
+
+    def load_tracker_state(self, state):
+        if state['trackers'] is not None:
+            # model.track(persist=True) reuses the predictor's trackers: a throwaway call
+            # with the same arguments sets the predictor up, then they are swapped in
+            self._model_track(np.zeros((64, 64, 3), dtype=np.uint8))
+            self.model.predictor.trackers = state['trackers']
+        self._load_state(state)
+
+    def _state(self, trackers):
+        from ultralytics.trackers.basetrack import BaseTrack
+        return {'trackers': trackers, 'batch_tracker': self.batch_tracker, 'next_id': BaseTrack._count,
+                'roi': (self.roi_passes, self.full_passes, self._since_full)}
+
+    def _load_state(self, state):
+        from ultralytics.trackers.basetrack import BaseTrack
+        self.batch_tracker = state['batch_tracker']
+        BaseTrack._count = state['next_id']
+        self.roi_passes, self.full_passes, self._since_full = state['roi']
+
+    @classmethod
+    def config(cls, model_name=DEFAULT_MODEL, roi=False, **runtime_options):
+        # Everything that changes the raw tracker output (used to key detection caches);
+        # runtime options such as threads only change speed
+        config = {'detector': cls.__name__, 'model': os.path.basename(model_name), 'tracker': cls.TRACKER,
+                  'track_conf': cls.TRACK_CONF}
+        if roi:
+            config['roi'] = {'scale': cls.ROI_SCALE, 'min_size': cls.ROI_MIN_SIZE, 'edge_margin': cls.ROI_EDGE_MARGIN,
+                             'min_iou': cls.ROI_MIN_IOU, 'refresh': cls.ROI_REFRESH, 'tracked': True}
+        return config
+
+    def track(self, frame):
+        results = self._model_track(frame)
+        self.full_passes += 1
+        self._since_full = 0
+        return self._candidates(results.boxes)
+
+    def _model_track(self, frame):
         # Run tracking (persist=True is essential for ByteTrack)
-        results = self.model.track(frame, persist=True, tracker="bytetrack.yaml", verbose=False)[0]
-        
-        # Parse detections: boxes, cls, id
-        # We need to handle cases where no tracks are found
-        if results.boxes is None or len(results.boxes) == 0:
-            return None, None
-            
-        # Filter for class 0 (person)
-        # boxes.id might be None if tracking not initialized or no tracks confirmed
-        candidates = []
-        for i, box in enumerate(results.boxes):
-             if int(box.cls) == 0 and box.conf.item() >= self.confidence_threshold:
-                 # Check if track id exists
-                 tid = int(box.id.item()) if box.id is not None else None
-                 candidates.append((box, tid))
-        
-        if not candidates:
-            return None, None
-            
+        return self.model.track(frame, persist=True, tracker=self.TRACKER, conf=self.TRACK_CONF,
+                                iou=self.NMS_IOU, max_det=self.MAX_DET, verbose=False)[0]
+
+    def candidates(self, frame):
+        # Raw detections of one frame, no tracking (all candidates have track_id -1)
+        return self._candidates(self._infer(frame, self.PREDICT_CONF))
+
+    def _infer(self, frame, conf):
+        # Raw model output -> Boxes (numpy, source pixels)
+        results = self.model.predict(frame, conf=conf, iou=self.NMS_IOU, max_det=self.MAX_DET, verbose=False)[0]
+        return results.boxes.cpu().numpy()
+
+    def _frame_tracker(self):
+        # The ByteTrack instance track() updates, None before the first track() call
+        trackers = getattr(getattr(self.model, 'predictor', None), 'trackers', None)
+        return trackers[0] if trackers else None
+
+    def _candidates(self, boxes):
+        # One device->host copy per frame; boxes.data columns are
+        # x1, y1, x2, y2, [track_id,] conf, cls (track_id only once tracks are confirmed)
+        if boxes is None or len(boxes) == 0:
+            return no_candidates()
+        data = boxes.data if isinstance(boxes.data, np.ndarray) else boxes.data.cpu().numpy()
+        if data.shape[1] == 7:
+            return make_candidates(data[:, :4], data[:, 5], data[:, 6], data[:, 4])
+        return make_candidates(data[:, :4], data[:, 4], data[:, 5])
+
+    def _new_tracker(self):
+        # The same ByteTrack instance model.track() builds internally
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+        try:
+            from ultralytics.utils import YAML
+            cfg = IterableSimpleNamespace(**YAML.load(check_yaml(self.TRACKER)))
+        except ImportError:
+            from ultralytics.utils import yaml_load
+            cfg = IterableSimpleNamespace(**yaml_load(check_yaml(self.TRACKER)))
+        try:
+            return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=30)
+        except TypeError:
+            return TRACKER_MAP[cfg.tracker_type](args=cfg)
+
+    def track_batch(self, frames):
+        # One model call for N frames, then ByteTrack association frame by frame in
+        # order, mirroring what model.track(persist=True) does per frame. Keeps its
+        # own tracker: do not mix with track() on the same stream.
+        if not frames:
+            return []
+        if self.batch_tracker is None:
+            self.batch_tracker = self._new_tracker()
+        # Same thresholds as track(), so the tracker sees the same boxes as with batch size 1
+        results = self.model.predict(list(frames), conf=self.TRACK_CONF, iou=self.NMS_IOU, max_det=self.MAX_DET, verbose=False)
+
+        out = [self._associate(self.batch_tracker, result.boxes.cpu().numpy(), frame)
+               for result, frame in zip(results, frames)]
+        self.full_passes += len(frames)
+        return out
+
+    def _associate(self, tracker, boxes, frame):
+        # One ByteTrack step for a frame's (numpy) Boxes -> candidates with track ids
+        tracks = tracker.update(boxes, frame)
+        if len(tracks) == 0:
+            if any(not t.is_activated for t in tracker.tracked_stracks):
+                # model.track hides detections while new tracks are unconfirmed
+                return no_candidates()
+            return self._candidates(boxes)
+        # Track rows: x1, y1, x2, y2, track_id, conf, cls, detection index
+        return make_candidates(tracks[:, :4], tracks[:, 5], tracks[:, 6], tracks[:, 4])
+
+    def detect_batch(self, frames, target_track_id=None):
+        # Batched detect(): one (Rect, track_id) per frame, the target carried across the batch
+        out = []
+        for frame, candidates in zip(frames, self.track_batch(frames)):
+            h, w = frame.shape[:2]
+            rect, track_id = select_candidate(candidates, target_track_id, w, h, self.confidence_threshold)
+            if track_id is not None:
+                target_track_id = track_id
+            out.append((rect, track_id))
+        return out
+
+    def roi_window(self, box, width, height):
+        # Square window (x1, y1, x2, y2) in source pixels around a pixel box, kept inside the frame
+        side = max(box[2] - box[0], box[3] - box[1]) * self.ROI_SCALE
+        side = int(min(max(side, self.ROI_MIN_SIZE), width, height))
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        x1 = int(min(max(cx - side / 2, 0), width - side))
+        y1 = int(min(max(cy - side / 2, 0), height - side))
+        return x1, y1, x1 + side, y1 + side
+
+    def track_roi(self, frame, box, track_id):
+        # Detect inside a padded window around the last target box (source pixels).
+        # The window is letterboxed up to the model input size, so distant skiers
+        # keep their pixels. Its detections, in frame pixels, go through the same
+        # ByteTrack update as a full pass, so the target keeps its track ID across
+        # window and full-frame passes. Falls back to a full-frame track() when no
+        # candidate overlaps the last box, the target nears the window edge, or no
+        # full pass ran for ROI_REFRESH frames.
+        h, w = frame.shape[:2]
+        tracker = self._frame_tracker()
+        if box is None or track_id is None or tracker is None or self._since_full >= self.ROI_REFRESH:
+            return self.track(frame)
+        wx1, wy1, wx2, wy2 = self.roi_window(box, w, h)
+        if wx2 - wx1 >= w and wy2 - wy1 >= h:
+            return self.track(frame)
+
+        # track() threshold: ByteTrack's second pass uses the low-score boxes
+        from ultralytics.engine.results import Boxes
+        data = np.array(self._infer(frame[wy1:wy2, wx1:wx2], self.TRACK_CONF).data, dtype=np.float32)
+        data[:, :4] += np.array([wx1, wy1, wx1, wy1], dtype=np.float32)
+        boxes = Boxes(data, (h, w))
+        candidates = self._candidates(boxes)
+
+        iou = box_iou(candidates['xyxy'], box)
+        eligible = ((candidates['cls'] == PERSON_CLASS_ID) & (candidates['conf'] >= self.confidence_threshold) &
+                    (iou >= self.ROI_MIN_IOU))
+        if not eligible.any():
+            return self.track(frame)
+        best = int(np.argmax(np.where(eligible, iou, -1.0)))
+        x1, y1, x2, y2 = candidates['xyxy'][best].tolist()
+
+        # Near a window edge that is not a frame edge: the subject may be cut off
+        margin = self.ROI_EDGE_MARGIN * (wx2 - wx1)
+        if ((wx1 > 0 and x1 - wx1 < margin) or (wx2 < w and wx2 - x2 < margin) or
+                (wy1 > 0 and y1 - wy1 < margin) or (wy2 < h and wy2 - y2 < margin)):
+            return self.track(frame)
+
+        # Checks passed: this frame's tracker update (a fallback above does its own)
+        self.roi_passes += 1
+        self._since_full += 1
+        return self._associate(tracker, boxes, frame)
+
+    def detect(self, frame, target_track_id=None, last_box=None):
+        # last_box: previous target box in source pixels, enables the ROI pass
+        h, w = frame.shape[:2]
+        if last_box is not None:
+            candidates = self.track_roi(frame, last_box, target_track_id)
+        else:
+            candidates = self.track(frame)
+        return select_candidate(candidates, target_track_id, w, h, self.confidence_threshold)
+
+# ---------- YOLOv8 on ONNX Runtime / OpenCV DNN ----------
+def letterbox(frame, size, canvas=None):
+    # Resize keeping the aspect ratio and pad to size (int or (width, height)) with grey
+    # (114), as Ultralytics does for fixed-shape exports -> (canvas, scale, pad_x, pad_y)
+    out_w, out_h = (size, size) if isinstance(size, int) else size
+    h, w = frame.shape[:2]
+    r = min(out_h / h, out_w / w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    left = int(round((out_w - nw) / 2 - 0.1))
+    top = int(round((out_h - nh) / 2 - 0.1))
+    if canvas is None:
+        canvas = np.empty((out_h, out_w, 3), dtype=np.uint8)
+    canvas.fill(114)
+    canvas[top:top + nh, left:left + nw] = frame if (nw, nh) == (w, h) else cv2.resize(frame, (nw, nh))
+    return canvas, r, left, top
+
+
+class YOLOv8ONNXDetector(YOLOv8Detector):
+    # YOLOv8 exported to ONNX (export_detector.py), run with ONNX Runtime or cv2.dnn
+    # on the CPU without torch inference. The input shape is fixed at export: for 16:9
+    # footage a 640x384 export does 40% less work than the 640x640 default. Int8
+    # weights (static QDQ quantization, export_detector.py) run on ONNX Runtime.
+    # Output and tracking match YOLOv8Detector: the same NMS defaults, the same
+    # ByteTrack association, the same candidate arrays, ROI mode included.
+    DEFAULT_MODEL = 'yolov8n.onnx'
+    BACKENDS = ('onnxruntime', 'opencv')
+
+    # Class offset for class-aware NMS in one call
+    MAX_WH = 7680
+
+    def __init__(self, model_name=DEFAULT_MODEL, backend='onnxruntime', threads=0, input_size=(640, 640)):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown ONNX backend {backend!r} (expected one of {self.BACKENDS})")
+        if not os.path.isfile(model_name):
+            raise FileNotFoundError(f"ONNX model not found: {model_name} (export one with export_detector.py)")
+        self.model_name = model_name
+        self.backend = backend
+        # (width, height); ONNX Runtime reads it from the model, cv2.dnn cannot
+        self.input_size = (input_size, input_size) if isinstance(input_size, int) else tuple(input_size)
+        if backend == 'onnxruntime':
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(model_name, options, providers=['CPUExecutionProvider'])
+            self.input_name = self.session.get_inputs()[0].name
+            shape = self.session.get_inputs()[0].shape
+            if isinstance(shape[2], int) and isinstance(shape[3], int):
+                self.input_size = (shape[3], shape[2])
+        else:
+            if threads:
+                cv2.setNumThreads(threads)
+            self.net = cv2.dnn.readNetFromONNX(model_name)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self._canvas = np.empty((self.input_size[1], self.input_size[0], 3), dtype=np.uint8)
+
+        self.confidence_threshold = DEFAULT_CONFIDENCE_THRESHOLD
+        self.person_class_id = PERSON_CLASS_ID
+        self.tracker = None
+        self.reset()
+
+    def reset(self):
+        self.tracker = None
+        self.batch_tracker = None
+        self.roi_passes = 0
+        self.full_passes = 0
+        self._since_full = 0
+
+    def tracker_state(self):
+        return self._state(self.tracker)
+
+    def load_tracker_state(self, state):
+        self.tracker = state['trackers']
+        self._load_state(state)
+
+    def _frame_tracker(self):
+        return self.tracker
+
+    @classmethod
+    def config(cls, model_name=DEFAULT_MODEL, backend='onnxruntime', roi=False, **runtime_options):
+        config = super().config(model_name, roi)
+        config['backend'] = backend
+        return config
+
+    def _infer(self, frame, conf):
+        # Raw model output -> Boxes (numpy, source pixels) after class-aware NMS
+        from ultralytics.engine.results import Boxes
+        canvas, r, left, top = letterbox(frame, self.input_size, self._canvas)
+        blob = cv2.dnn.blobFromImage(canvas, 1.0 / 255.0, swapRB=True)
+        if self.backend == 'onnxruntime':
+            output = self.session.run(None, {self.input_name: blob})[0][0]
+        else:
+            self.net.setInput(blob)
+            output = self.net.forward()[0]
+
+        # output: (4 + classes, anchors) -> cx, cy, w, h and one score per class
+        scores = output[4:]
+        cls = scores.argmax(axis=0)
+        score = scores[cls, np.arange(scores.shape[1])]
+        keep = score > conf
+        boxes, score, cls = output[:4, keep].T, score[keep], cls[keep]
+
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+        if len(xyxy):
+            offset = (cls * self.MAX_WH)[:, None].astype(np.float32)
+            nms_boxes = np.concatenate([xyxy[:, :2] + offset, boxes[:, 2:]], axis=1)
+            idx = np.asarray(cv2.dnn.NMSBoxes(nms_boxes.tolist(), score.tolist(), conf, self.NMS_IOU),
+                             dtype=np.int64).reshape(-1)
+            idx = idx[np.argsort(-score[idx], kind='stable')][:self.MAX_DET]
+            xyxy, score, cls = xyxy[idx], score[idx], cls[idx]
+
         h, w = frame.shape[:2]
-        
-        # Selection Logic
-        selected = None
-        
-        if target_track_id is not None:
-             # 1. Try to find the specific track ID
-             for box, tid in candidates:
-                 if tid == target_track_id:
-                     selected = (box, tid)
-                     break
-        
-        if selected is None:
-             # 2. Fallback: Find closest to center (Initial acquisition or recovery)
-             # Note: If target_track_id was set but not found, we effectively 'lost' and re-acquire
-             # or we could return None, None to indicate loss.
-             # Let's return best candidate (closest to center) and let the caller decide if it wants to switch.
-             # Actually, for "Recovery", simpler is picking closest to center.
-             centre_x, centre_y = w / 2, h / 2
-             best_dist = float('inf')
-             
-             for box, tid in candidates:
-                 x1, y1, x2, y2 = box.xyxy[0].tolist()
-                 cx = (x1 + x2) / 2
-                 cy = (y1 + y2) / 2
-                 dist = (cx - centre_x) ** 2 + (cy - centre_y) ** 2
-                 if dist < best_dist:
-                     best_dist = dist
-                     selected = (box, tid)
-
-        if selected is None:
-            return None, None
-
-        box, tid = selected
-        x1, y1, x2, y2 = box.xyxy[0].tolist()
-        
-        # Convert to normalized Rect (top‑left origin)
-        left = x1 / w
-        top = y1 / h
-        right = x2 / w
-        bottom = y2 / h
-        return Rect(left, top, right, bottom), tid
+        xyxy -= np.array([left, top, left, top], dtype=np.float32)
+        xyxy /= r
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+        data = np.concatenate([xyxy, score[:, None], cls[:, None].astype(np.float32)], axis=1)
+        return Boxes(data, (h, w))
+
+    def track(self, frame):
+        if self.tracker is None:
+            self.tracker = self._new_tracker()
+        candidates = self._associate(self.tracker, self._infer(frame, self.TRACK_CONF), frame)
+        self.full_passes += 1
+        self._since_full = 0
+        return candidates
+
+    def track_batch(self, frames):
+        # Fixed-shape exports take one frame per call
+        return [self.track(frame) for frame in frames]
 
 # ---------- EfficientDet D0 placeholder ----------
 class EfficientDetD0Detector:
@@ -85,56 +470,63 @@ class EfficientDetD0Detector:
 
 # ---------- MobileNet SSD placeholder ----------
 class MobileNetSSDDetector:
-    def __init__(self, prototxt_url=None, model_url=None):
-        import os, urllib.request
-        # Default URLs for Caffe model
-        if prototxt_url is None:
-            prototxt_url = 'https://raw.githubusercontent.com/chuanqi305/MobileNet-SSD/master/MobileNetSSD_deploy.prototxt'
-        if model_url is None:
-            model_url = 'https://raw.githubusercontent.com/chuanqi305/MobileNet-SSD/master/MobileNetSSD_deploy.caffemodel'
-        self.prototxt_path = os.path.join(os.path.expanduser('~'), '.cache', 'MobileNetSSD_deploy.prototxt')
-        self.model_path = os.path.join(os.path.expanduser('~'), '.cache', 'MobileNetSSD_deploy.caffemodel')
-        os.makedirs(os.path.dirname(self.prototxt_path), exist_ok=True)
-        # Download if missing
-        if not os.path.isfile(self.prototxt_path):
-            print('Downloading MobileNetSSD prototxt...')
-            urllib.request.urlretrieve(prototxt_url, self.prototxt_path)
-        if not os.path.isfile(self.model_path):
-            print('Downloading MobileNetSSD caffemodel...')
-            urllib.request.urlretrieve(model_url, self.model_path)
+    # Caffe MobileNet-SSD (chuanqi305/MobileNet-SSD), loaded from local files only
+    def __init__(self, prototxt_path=None, model_path=None):
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache')
+        self.prototxt_path = prototxt_path or os.path.join(cache_dir, 'MobileNetSSD_deploy.prototxt')
+        self.model_path = model_path or os.path.join(cache_dir, 'MobileNetSSD_deploy.caffemodel')
+        for path in (self.prototxt_path, self.model_path):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"MobileNet SSD file not found: {path}")
         # Load the network
         self.net = cv2.dnn.readNetFromCaffe(self.prototxt_path, self.model_path)
         self.confidence_threshold = 0.3
         # Class ID for "person" in this model is 15
         self.person_class_id = 15
 
-    def detect(self, frame):
+    def candidates(self, frame):
+        # All SSD detections as a candidate array (no tracking)
         (h, w) = frame.shape[:2]
         blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
         self.net.setInput(blob)
-        detections = self.net.forward()
-        best = None
-        best_dist = float('inf')
-        for i in range(detections.shape[2]):
-            confidence = float(detections[0, 0, i, 2])
-            if confidence > self.confidence_threshold:
-                class_id = int(detections[0, 0, i, 1])
-                if class_id == self.person_class_id:
-                    box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                    (x1, y1, x2, y2) = box.astype('int')
-                    cx = (x1 + x2) / 2
-                    cy = (y1 + y2) / 2
-                    dist = (cx - w/2)**2 + (cy - h/2)**2
-                    if dist < best_dist:
-                        best_dist = dist
-                        best = (x1, y1, x2, y2)
-        if best is None:
-            return None
-        x1, y1, x2, y2 = best
-        # Normalized Rect (top‑left origin)
-        left = x1 / w
-        top = y1 / h
-        right = x2 / w
-        bottom = y2 / h
-        return Rect(left, top, right, bottom)
+        detections = self.net.forward()[0, 0]
+        boxes = (detections[:, 3:7] * np.array([w, h, w, h])).astype('int')
+        return make_candidates(boxes, detections[:, 2], detections[:, 1].astype(np.int16))
+
+    def detect(self, frame):
+        (h, w) = frame.shape[:2]
+        rect, _ = select_candidate(self.candidates(frame), None, w, h, self.confidence_threshold, self.person_class_id)
+        return rect
+
+# ---------- Registry ----------
+# Detectors by name for evaluation and CLI selection: a class plus default constructor
+# options. Every detector has candidates(frame), confidence_threshold and person_class_id;
+# the ones VideoProcessor can drive also have track()/track_batch()/track_roi()/reset()
+# and a config() classmethod for detection cache keys. All weights are local files.
+DETECTORS = {}
+
+def register_detector(name, cls, **defaults):
+    DETECTORS[name] = (cls, defaults)
+
+def _registered(name):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector {name!r} (known: {', '.join(sorted(DETECTORS))})")
+    return DETECTORS[name]
+
+def create_detector(name, **options):
+    cls, defaults = _registered(name)
+    return cls(**dict(defaults, **options))
+
+def detector_config(name, roi=False, **options):
+    cls, defaults = _registered(name)
+    return cls.config(roi=roi, **dict(defaults, **options))
+
+def tracking_detectors():
+    return sorted(name for name, (cls, _) in DETECTORS.items() if hasattr(cls, 'track'))
 
+register_detector('yolov8n', YOLOv8Detector)
+register_detector('yolov8n_onnx', YOLOv8ONNXDetector, model_name='yolov8n.onnx', backend='onnxruntime')
+register_detector('yolov8n_onnx_int8', YOLOv8ONNXDetector, model_name='yolov8n.int8.onnx', backend='onnxruntime')
+register_detector('yolov8n_opencv', YOLOv8ONNXDetector, model_name='yolov8n.onnx', backend='opencv')
+register_detector('efficientdet_d0', EfficientDetD0Detector)
+register_detector('mobilenet_ssd', MobileNetSSDDetector)
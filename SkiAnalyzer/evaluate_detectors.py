@@ -1,46 +1,209 @@
-import cv2
-from detectors import YOLOv8Detector, EfficientDetD0Detector, MobileNetSSDDetector
-
-VIDEO_PATH = '/Users/vincentchoi/development/SkiCamera/ambles_parallel_demo_20260107.mp4'
-
-# Initialize detectors (YOLOv8 will download model if needed)
-yolo = YOLOv8Detector()
-# Placeholders – will raise NotImplementedError if instantiated
-try:
-    efficient = EfficientDetD0Detector()
-except NotImplementedError:
-    efficient = None
-try:
-    mobilenet = MobileNetSSDDetector('path/to/prototxt', 'path/to/caffemodel')
-except NotImplementedError:
-    mobilenet = None
-
-# Helper to evaluate a detector
-def evaluate(detector, name):
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    detected = 0
-    frame_idx = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from detectors import DETECTORS, box_iou, create_detector, tracking_detectors
+from frame_store import FrameStore
+
+# Detector evaluation: every frame is decoded once (into a memory-mapped frame store
+# that later runs reuse) and handed to all selected detectors in turn. Per detector:
+# latency percentiles and throughput, and, given a ground-truth file, precision,
+# recall and mean IoU of person boxes.
+#
+# Ground truth (source pixels), either
+#   CSV with header frame,x1,y1,x2,y2 - one row per box; a row with empty box
+#     columns marks an annotated frame without people
+#   JSON {"frames": {"<frame>": [[x1, y1, x2, y2], ...]}}
+# Frames missing from the file are not annotated and do not count for accuracy.
+#
+# --check-batch N checks that batched tracking (track_batch, N frames per model call)
+# gives the same candidates as per-frame track(): boxes, scores, classes and track IDs.
+
+DEFAULT_IOU_THRESHOLD = 0.5
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def load_ground_truth(path):
+    # {source frame number: (N, 4) float array}
+    truth = {}
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            frames = json.load(f)['frames']
+        for frame, boxes in frames.items():
+            truth[int(frame)] = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        return truth
+    with open(path, newline='') as f:
+        rows = {}
+        for row in csv.DictReader(f):
+            boxes = rows.setdefault(int(row['frame']), [])
+            if row.get('x1'):
+                boxes.append([float(row[k]) for k in ('x1', 'y1', 'x2', 'y2')])
+    return {frame: np.asarray(boxes, dtype=np.float64).reshape(-1, 4) for frame, boxes in rows.items()}
+
+
+def match_boxes(pred, conf, truth, iou_threshold=DEFAULT_IOU_THRESHOLD):
+    # Greedy matching, most confident prediction first -> (true positives, false positives,
+    # false negatives, IoUs of the matched pairs)
+    matched = np.zeros(len(truth), dtype=bool)
+    ious = []
+    for i in np.argsort(-conf):
+        if len(truth) == 0:
             break
-        if detector:
-            rect = detector.detect(frame)
-            if rect is not None:
-                detected += 1
-        frame_idx += 1
-    cap.release()
-    rate = detected / total * 100 if total > 0 else 0
-    print(f"{name}: Detected {detected}/{total} frames ({rate:.2f}% detection rate)")
-
-# Run evaluations
-evaluate(yolo, 'YOLOv8 (yolov8n)')
-if efficient:
-    evaluate(efficient, 'EfficientDet D0')
-else:
-    print('EfficientDet D0: Not implemented – detection rate 0%')
-if mobilenet:
-    evaluate(mobilenet, 'MobileNet SSD')
-else:
-    print('MobileNet SSD: Not implemented – detection rate 0%')
+        iou = np.where(matched, -1.0, box_iou(truth, pred[i]))
+        best = int(np.argmax(iou))
+        if iou[best] >= iou_threshold:
+            matched[best] = True
+            ious.append(float(iou[best]))
+    tp = len(ious)
+    return tp, len(pred) - tp, len(truth) - tp, ious
+
+
+class DetectorStats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.frames_with_person = 0
+        self.tp = 0
+        self.fp = 0
+        self.fn = 0
+        self.ious = []
+
+    def report(self, warmup):
+        row = {'detector': self.name, 'frames': len(self.latencies)}
+        if not self.latencies:
+            return row
+        latencies = np.asarray(self.latencies[warmup:] or self.latencies) * 1000.0
+        for p, value in zip(LATENCY_PERCENTILES, np.percentile(latencies, LATENCY_PERCENTILES)):
+            row[f'latency_p{p}_ms'] = float(value)
+        row['latency_mean_ms'] = float(latencies.mean())
+        row['fps'] = 1000.0 / row['latency_mean_ms'] if row['latency_mean_ms'] > 0 else 0.0
+        row['person_frame_rate'] = self.frames_with_person / len(self.latencies)
+        if self.tp + self.fp + self.fn:
+            row['precision'] = self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+            row['recall'] = self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+            row['mean_iou'] = float(np.mean(self.ious)) if self.ious else 0.0
+        return row
+
+
+def evaluate(store, detectors, truth=None, iou_threshold=DEFAULT_IOU_THRESHOLD, warmup=3):
+    # detectors: {name: detector}. Returns one report row per detector.
+    if not len(store):
+        raise ValueError("No frames to evaluate: the video is empty or could not be decoded")
+    stats = {name: DetectorStats(name) for name in detectors}
+    scale = store.source_size[0] / store.frames.shape[2]
+    for i in range(len(store)):
+        # One read from the store per frame, shared by every detector
+        frame = np.ascontiguousarray(store[i])
+        frame_truth = truth.get(store.frame_numbers[i]) if truth else None
+        for name, detector in detectors.items():
+            start = time.perf_counter()
+            candidates = detector.candidates(frame)
+            stats[name].latencies.append(time.perf_counter() - start)
+
+            people = candidates[(candidates['cls'] == detector.person_class_id) &
+                                (candidates['conf'] >= detector.confidence_threshold)]
+            if len(people):
+                stats[name].frames_with_person += 1
+            if frame_truth is not None:
+                tp, fp, fn, ious = match_boxes(people['xyxy'].astype(np.float64) * scale, people['conf'],
+                                               frame_truth, iou_threshold)
+                s = stats[name]
+                s.tp += tp
+                s.fp += fp
+                s.fn += fn
+                s.ious += ious
+    return [s.report(warmup) for s in stats.values()]
+
+
+def check_batch(store, detector, batch_size, atol=1.0):
+    # Frames (store indices) where batched and per-frame tracking disagree. Both passes
+    # start from the same fresh tracker state, track IDs included.
+    fresh = detector.tracker_state()
+    frames = [np.ascontiguousarray(store[i]) for i in range(len(store))]
+    per_frame = [detector.track(frame) for frame in frames]
+    detector.reset()
+    detector.load_tracker_state(fresh)
+    batched = []
+    for start in range(0, len(frames), batch_size):
+        batched += detector.track_batch(frames[start:start + batch_size])
+    detector.reset()
+    return [i for i, (a, b) in enumerate(zip(per_frame, batched)) if not _same_candidates(a, b, atol)]
+
+
+def _same_candidates(a, b, atol):
+    if len(a) != len(b):
+        return False
+    # Row order is not part of the result: compare sorted by track, class and box
+    a, b = (c[np.lexsort((*c['xyxy'].T[::-1], c['cls'], c['track_id']))] for c in (a, b))
+    return (np.array_equal(a['track_id'], b['track_id']) and np.array_equal(a['cls'], b['cls']) and
+            np.allclose(a['conf'], b['conf'], atol=1e-3) and np.allclose(a['xyxy'], b['xyxy'], atol=atol))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate detectors on one video: latency, throughput and accuracy')
+    parser.add_argument('video', help='Input video')
+    parser.add_argument('--detector', action='append', choices=sorted(DETECTORS),
+                        help='Detector to evaluate (repeatable, default: all that load)')
+    parser.add_argument('--ground-truth', help='Person boxes per frame, CSV or JSON (source pixels)')
+    parser.add_argument('--iou', type=float, default=DEFAULT_IOU_THRESHOLD, help='IoU for a true positive')
+    parser.add_argument('--store-dir', default='frame_store', help='Where decoded frames are kept between runs')
+    parser.add_argument('--max-frames', type=int, default=None, help='Evaluate at most this many frames')
+    parser.add_argument('--step', type=int, default=1, help='Evaluate every Nth frame')
+    parser.add_argument('--max-size', type=int, default=None, help='Downscale stored frames to this longer side')
+    parser.add_argument('--warmup', type=int, default=3, help='Frames left out of the latency statistics')
+    parser.add_argument('--csv', help='Write the report to this CSV file')
+    parser.add_argument('--check-batch', type=int, metavar='N',
+                        help='Instead of evaluating, check that tracking N frames per model call matches per-frame tracking')
+    args = parser.parse_args()
+
+    detectors = {}
+    for name in args.detector or sorted(DETECTORS):
+        try:
+            detectors[name] = create_detector(name)
+        except Exception as e:
+            # Placeholders and detectors whose weights cannot be fetched are reported and skipped
+            print(f"{name}: not available ({type(e).__name__}: {e})")
+    if not detectors:
+        parser.error("No detector could be loaded")
+
+    start = time.perf_counter()
+    try:
+        store = FrameStore.open(args.store_dir, os.path.abspath(args.video), args.max_frames, args.step, args.max_size)
+    except RuntimeError as e:
+        parser.error(str(e))
+    if not len(store):
+        parser.error(f"No frames decoded from {args.video}")
+    print(f"Frames: {len(store)} ({store.frames.shape[2]}x{store.frames.shape[1]}) ready in {time.perf_counter() - start:.1f}s")
+    truth = load_ground_truth(args.ground_truth) if args.ground_truth else None
+
+    if args.check_batch:
+        failed = False
+        for name, detector in detectors.items():
+            if name not in tracking_detectors():
+                continue
+            mismatches = check_batch(store, detector, args.check_batch)
+            failed = failed or bool(mismatches)
+            print(f"{name}: batch {args.check_batch} vs per frame: "
+                  f"{f'{len(mismatches)} of {len(store)} frames differ (first: {mismatches[:10]})' if mismatches else f'all {len(store)} frames match'}")
+        raise SystemExit(1 if failed else 0)
+
+    rows = evaluate(store, detectors, truth, args.iou, args.warmup)
+    columns = ['latency_p50_ms', 'latency_p90_ms', 'latency_p99_ms', 'fps', 'person_frame_rate', 'precision', 'recall', 'mean_iou']
+    print(' | '.join(f"{c:>16.16}" for c in ['detector'] + columns))
+    for row in rows:
+        print(' | '.join([f"{row['detector']:>16.16}"] +
+                         [f"{row[c]:>16.3f}" if c in row else f"{'-':>16}" for c in columns]))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['detector', 'frames', 'latency_mean_ms'] + columns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved: {args.csv}")
+
+if __name__ == "__main__":
+    main()
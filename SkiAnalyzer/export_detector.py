@@ -0,0 +1,121 @@
+import argparse
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from detectors import letterbox
+
+# Prepare CPU detector weights from a local YOLOv8 checkpoint:
+#   export:   yolov8n.pt -> yolov8n.onnx (fixed input shape, batch 1)
+#   quantize: yolov8n.onnx -> yolov8n.int8.onnx, static int8 (QDQ) quantization
+#             calibrated on frames of a local video
+# Both run offline; nothing is downloaded.
+
+
+def export_onnx(weights, output, imgsz=(640, 640)):
+    # imgsz: (height, width) or one side; 384x640 fits 16:9 footage
+    from ultralytics import YOLO
+    if not os.path.isfile(weights):
+        raise FileNotFoundError(f"Checkpoint not found: {weights}")
+    exported = YOLO(weights).export(format='onnx', imgsz=imgsz, simplify=False, dynamic=False)
+    if os.path.abspath(exported) != os.path.abspath(output):
+        shutil.move(exported, output)
+    return output
+
+
+def calibration_frames(video_path, count=64, input_size=(640, 640)):
+    # count frames spread over the video, preprocessed exactly like YOLOv8ONNXDetector
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open {video_path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    wanted = set(np.linspace(0, max(total - 1, 0), count).astype(int).tolist())
+    blobs = []
+    idx = 0
+    try:
+        while len(blobs) < len(wanted):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if idx in wanted:
+                canvas, _, _, _ = letterbox(frame, input_size)
+                blobs.append(cv2.dnn.blobFromImage(canvas, 1.0 / 255.0, swapRB=True))
+            idx += 1
+    finally:
+        cap.release()
+    if not blobs:
+        raise RuntimeError(f"No frames decoded from {video_path}")
+    return blobs
+
+
+def quantize_int8(model_path, output, calibration_video, frames=64):
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    model_input = ort.InferenceSession(model_path, providers=['CPUExecutionProvider']).get_inputs()[0]
+    input_name = model_input.name
+    blobs = calibration_frames(calibration_video, frames, (model_input.shape[3], model_input.shape[2]))
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.items = iter([{input_name: blob} for blob in blobs])
+
+        def get_next(self):
+            return next(self.items, None)
+
+    prepared = output + '.prep.onnx'
+    try:
+        quant_pre_process(model_path, prepared)
+        # Box/score decoding stays in float: quantizing it costs most of the
+        # accuracy for little speed
+        quantize_static(prepared, output, Reader(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        per_channel=True, nodes_to_exclude=_head_nodes(prepared))
+    finally:
+        if os.path.exists(prepared):
+            os.remove(prepared)
+    return output
+
+
+def _head_nodes(model_path):
+    # Box/score decoding: everything after the Concat that joins the three detection
+    # scales, i.e. from the DFL softmax on (nodes are stored in topological order)
+    import onnx
+    nodes = onnx.load(model_path).graph.node
+    ops = [node.op_type for node in nodes]
+    if 'Softmax' not in ops:
+        return []
+    softmax = ops.index('Softmax')
+    start = max((i for i in range(softmax) if ops[i] == 'Concat'), default=softmax - 1) + 1
+    return [node.name for node in nodes[start:] if node.name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export YOLOv8 to ONNX and build int8 weights for CPU backends')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('export', help='Local .pt checkpoint -> ONNX')
+    p.add_argument('weights', help='YOLOv8 checkpoint, e.g. yolov8n.pt')
+    p.add_argument('--output', help='ONNX path (default: next to the checkpoint)')
+    p.add_argument('--imgsz', type=int, nargs='+', default=[640], help='Input size: SIDE or HEIGHT WIDTH (e.g. 384 640 for 16:9)')
+
+    p = sub.add_parser('quantize', help='ONNX -> int8 ONNX (static, calibrated on a local video)')
+    p.add_argument('model', help='Float ONNX model')
+    p.add_argument('--calibration-video', required=True, help='Representative footage')
+    p.add_argument('--frames', type=int, default=64, help='Calibration frames')
+    p.add_argument('--output', help='Output path (default: <model>.int8.onnx)')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        output = args.output or os.path.splitext(args.weights)[0] + '.onnx'
+        imgsz = args.imgsz[0] if len(args.imgsz) == 1 else tuple(args.imgsz[:2])
+        print(f"Exported: {export_onnx(args.weights, output, imgsz)}")
+    else:
+        output = args.output or os.path.splitext(args.model)[0] + '.int8.onnx'
+        print(f"Quantized: {quantize_int8(args.model, output, args.calibration_video, args.frames)}")
+
+if __name__ == "__main__":
+    main()
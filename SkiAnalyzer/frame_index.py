@@ -0,0 +1,139 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from util import video_signature
+
+# Frame index of one video: the presentation time of every frame and which frames are
+# keyframes. It is read from the demuxed packets without decoding them (OpenCV's raw
+# stream mode), which takes milliseconds per thousand frames, and saved next to the
+# video, so it is built once per video.
+#   - times turn seconds into frame numbers, also for variable frame rate sources
+#   - keyframes bound the cost of reaching a frame: a seek lands on the keyframe at
+#     or before it and decodes forward from there
+#   - every seek is checked against the indexed time of the frame it returned
+# Frame numbers count decoded frames in presentation order, as VideoProcessor does.
+
+INDEX_VERSION = 1
+
+
+def default_index_path(video_path):
+    return os.path.splitext(video_path)[0] + '.frameindex.npz'
+
+
+class FrameIndex:
+    def __init__(self, times, keyframes, fps, width, height, source=None):
+        # times: (frames,) seconds from the first frame, increasing
+        # keyframes: sorted frame numbers a decoder can start from, always including 0
+        self.times = np.asarray(times, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.source = source or {}
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return self.times[-1] + 1.0 / self.fps if len(self.times) else 0.0
+
+    def frame_at(self, seconds):
+        # The frame on screen at this time
+        frame = int(np.searchsorted(self.times, seconds + 1e-6, side='right')) - 1
+        return min(max(frame, 0), len(self.times) - 1)
+
+    def keyframe_before(self, frame):
+        return int(self.keyframes[np.searchsorted(self.keyframes, frame, side='right') - 1])
+
+    def seek_cost(self, frame):
+        # Frames a seek decodes before it can return frame
+        return frame - self.keyframe_before(frame)
+
+    def seek(self, cap, frame):
+        # Read frame from cap (any position); cap then continues with frame + 1.
+        # OpenCV numbers frames by timestamp assuming a constant rate, so ask for the
+        # frame at the indexed time: that also finds frames of variable rate sources.
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(round(self.times[frame] * self.fps)))
+        ok, image = cap.read()
+        if ok and self._returned(cap, frame):
+            return image
+        # Timestamps OpenCV cannot seek by: decode forward from the start
+        print(f"Seek to frame {frame} missed, decoding from the start")
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(frame):
+            if not cap.grab():
+                break
+        ok, image = cap.read()
+        if not ok:
+            raise RuntimeError(f"Cannot read frame {frame}")
+        return image
+
+    def _returned(self, cap, frame):
+        return abs(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 - self.times[frame]) < 0.5 / self.fps
+
+    @classmethod
+    def build(cls, video_path):
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open {video_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        raw = cap.get(cv2.CAP_PROP_FORMAT) == -1
+        times = []
+        key_times = []
+        try:
+            # Raw mode: grab() only demuxes. Packets come in decode order (B-frames
+            # after the frames they reference), so times are sorted afterwards.
+            while cap.grab():
+                t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                times.append(t)
+                if raw and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    key_times.append(t)
+        finally:
+            cap.release()
+        if not times:
+            raise RuntimeError(f"No frames in {video_path}")
+        times = np.sort(np.array(times))
+        if raw:
+            keyframes = np.union1d([0], np.searchsorted(times, key_times))
+        else:
+            # Decoded without packet flags: keyframes unknown, so every frame is a seek target
+            keyframes = np.arange(len(times))
+        return cls(times - times[0], keyframes, fps, width, height, video_signature(video_path))
+
+    def save(self, path):
+        meta = {'version': INDEX_VERSION, 'fps': self.fps, 'width': self.width, 'height': self.height,
+                'source': self.source}
+        # Write then rename, so a reader never sees a truncated index
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, times=self.times, keyframes=self.keyframes, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != INDEX_VERSION:
+                raise ValueError(f"Unsupported frame index version in {path}")
+            return cls(data['times'], data['keyframes'], meta['fps'], meta['width'], meta['height'], meta['source'])
+
+    @classmethod
+    def open(cls, video_path, path=None):
+        # The saved index of this video, built (and saved) on first use or when the video changed
+        path = path or default_index_path(video_path)
+        if os.path.isfile(path):
+            index = cls.load(path)
+            if index.source == video_signature(video_path):
+                return index
+        index = cls.build(video_path)
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Could not save frame index to {path}: {e}")
+        print(f"Indexed {len(index)} frames ({len(index.keyframes)} keyframes): {path}")
+        return index
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+from detection_cache import hash_video
+
+# Decoded frames of one video in a memory-mapped .npy file (frames, height, width, 3)
+# uint8 BGR, so repeated evaluations read frames straight from the page cache instead
+# of decoding again. A JSON sidecar holds the source fps, the decoded count and the
+# source frame number of every stored frame (stores can keep every Nth frame).
+# Stores are keyed by video content and sampling, like detection caches.
+
+STORE_VERSION = 1
+
+
+def store_key(video_path, max_frames=None, step=1, max_size=None):
+    payload = json.dumps({'video': hash_video(video_path), 'max_frames': max_frames, 'step': step,
+                          'max_size': max_size, 'version': STORE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class FrameStore:
+    def __init__(self, path):
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported frame store version in {path}")
+        self.path = path
+        self.fps = meta['fps']
+        self.source_size = tuple(meta['source_size'])
+        self.frame_numbers = meta['frame_numbers']
+        self.frames = np.load(path, mmap_mode='r')[:len(self.frame_numbers)]
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+    def __getitem__(self, i):
+        return self.frames[i]
+
+    @staticmethod
+    def path_for(store_dir, video_path, max_frames=None, step=1, max_size=None):
+        return os.path.join(store_dir, f"{store_key(video_path, max_frames, step, max_size)}.npy")
+
+    @classmethod
+    def open(cls, store_dir, video_path, max_frames=None, step=1, max_size=None):
+        # Reuse the store for this video and sampling, decoding it on the first call
+        path = cls.path_for(store_dir, video_path, max_frames, step, max_size)
+        if not (os.path.isfile(path) and os.path.isfile(path + '.json')):
+            cls.build(video_path, path, max_frames, step, max_size)
+        return cls(path)
+
+    @classmethod
+    def build(cls, video_path, path, max_frames=None, step=1, max_size=None):
+        # Decode every step-th frame (up to max_frames stored frames), downscaled so the
+        # longer side is at most max_size. Annotations stay in source pixels.
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open {video_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        # The container's frame count is an estimate: allocate for it, record what was decoded
+        capacity = -(-max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 1) // step)
+        if max_frames:
+            capacity = min(capacity, max_frames)
+        scale = min(1.0, max_size / max(width, height)) if max_size else 1.0
+        size = (int(round(width * scale)), int(round(height * scale)))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp.npy'
+        store = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(capacity, size[1], size[0], 3))
+        frame_numbers = []
+        source_idx = 0
+        try:
+            while len(frame_numbers) < capacity:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if source_idx % step == 0:
+                    i = len(frame_numbers)
+                    if scale < 1.0:
+                        cv2.resize(frame, size, dst=store[i], interpolation=cv2.INTER_AREA)
+                    else:
+                        store[i] = frame
+                    frame_numbers.append(source_idx)
+                source_idx += 1
+        finally:
+            cap.release()
+            store.flush()
+            del store
+
+        # Write then rename, so an interrupted build is never mistaken for a store
+        os.replace(tmp_path, path)
+        meta = {'version': STORE_VERSION, 'fps': fps, 'source_size': [width, height],
+                'frame_numbers': frame_numbers}
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.json.tmp', path + '.json')
+        return path
@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from cli_options import detector_options, parse_output_size
+from detection_stride import ConstantVelocityPredictor
+from detectors import create_detector, tracking_detectors
+from profiler import Progress
+from video_processor import VideoProcessor
+from video_writer import open_writer
+
+# Live mode: zoomed output from a stream (camera, stdin pipe, network URL, or a file
+# replayed at real-time pace) within a latency budget. Nothing queues up:
+#   - LiveSource decodes on its own thread and keeps only the newest frame, so while
+#     the processor is busy older frames are replaced (dropped), never buffered
+#   - a frame that is already older than the budget when it is picked up is dropped
+#   - DetectScheduler decides per frame whether the detector runs or the motion model
+#     predicts the box, so detection never pushes a frame past the budget
+#   - AutoZoom, motion prediction and pose get real frame intervals from the capture
+#     timestamps instead of 1/fps
+#   - the recording keeps the source rate and timing: the slot of a dropped frame
+#     repeats the previous output frame
+# Latency is measured glass to glass: from the moment a frame is read from the source
+# (replayed files: its scheduled presentation time) until it has been written/shown.
+
+DEFAULT_LATENCY_BUDGET = 0.2
+DEFAULT_MAX_PREDICTION = 0.5
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+class LiveSource:
+    # source: camera index ('0'), '-' for a container on stdin, a URL or a file path.
+    # Files are paced to their frame rate by default (replay); live sources are not.
+    def __init__(self, source, pace=None):
+        self.source = source
+        if source.isdigit():
+            self.cap = cv2.VideoCapture(int(source))
+        elif source == '-':
+            self.cap = cv2.VideoCapture('pipe:0', cv2.CAP_FFMPEG)
+        else:
+            self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open stream: {source}")
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps < 1000 else 30.0
+        self.pace = os.path.isfile(source) if pace is None else pace
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._ended = False
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Stats
+        self.frames = 0
+        self.superseded = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-source", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if self.pace:
+                    # Frame i reaches the glass at start + i / fps
+                    captured = start + self.frames / self.fps
+                    delay = captured - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                else:
+                    captured = time.monotonic()
+                with self._cond:
+                    if self._latest is not None:
+                        self.superseded += 1
+                    self._latest = (frame, captured)
+                    self.frames += 1
+                    self._cond.notify()
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify()
+
+    def get(self):
+        # Newest unread (frame, capture time), waiting for one; None once the stream ended
+        with self._cond:
+            while self._latest is None and not self._ended:
+                self._cond.wait()
+            item = self._latest
+            self._latest = None
+            return item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            # A blocked camera read returns within a frame interval
+            self._thread.join(timeout=2.0)
+        self.cap.release()
+
+
+class DetectScheduler:
+    # Per frame: run the detector (fresh box) or let the motion model predict it.
+    #   - a detection has to fit the budget: frame age + detect time + render time
+    #   - detections spend the time rendering leaves free (token bucket over stream
+    #     time), so the output keeps up with the source instead of dropping frames
+    #   - a prediction never runs longer than max_prediction seconds, and without a
+    #     subject there is nothing to predict: then the detector runs regardless
+    def __init__(self, budget=DEFAULT_LATENCY_BUDGET, max_prediction=DEFAULT_MAX_PREDICTION, smoothing=0.2):
+        self.budget = budget
+        self.max_prediction = max_prediction
+        self.smoothing = smoothing
+        # EMAs of the measured costs (seconds)
+        self.detect_time = 0.0
+        self.render_time = 0.0
+        self.credit = 0.0
+        self.last_detection = None
+
+        # Stats
+        self.detected = 0
+        self.predicted = 0
+        self.forced = 0
+
+    def _ema(self, value, sample):
+        return sample if value == 0.0 else value + self.smoothing * (sample - value)
+
+    def should_detect(self, captured, dt, age, can_predict):
+        self.credit = min(self.credit + max(dt - self.render_time, 0.0), self.detect_time)
+        if not can_predict or self.last_detection is None or captured - self.last_detection >= self.max_prediction:
+            self.forced += 1
+            return True
+        if age + self.detect_time + self.render_time > self.budget:
+            return False
+        return self.credit >= self.detect_time
+
+    def record_detection(self, captured, elapsed):
+        self.detected += 1
+        self.last_detection = captured
+        self.detect_time = self._ema(self.detect_time, elapsed)
+        # Debt from forced detections is paid back, at most one detection's worth
+        self.credit = max(self.credit - elapsed, -self.detect_time)
+
+    def record_prediction(self):
+        self.predicted += 1
+
+    def record_render(self, elapsed):
+        self.render_time = self._ema(self.render_time, elapsed)
+
+
+class LiveProcessor(VideoProcessor):
+    # VideoProcessor driven by a LiveSource: same detection, selection, AutoZoom,
+    # render and pose code, per frame on the calling thread. Detection cache, stride
+    # and batching are file features and stay off.
+    def __init__(self, source, output_path=None, latency_budget=DEFAULT_LATENCY_BUDGET,
+                 max_prediction=DEFAULT_MAX_PREDICTION, pace=None, display=False, **options):
+        super().__init__(source, output_path, **options)
+        self.pace = pace
+        self.display = display
+        self.scheduler = DetectScheduler(latency_budget, max_prediction)
+        self.latencies = []
+        self.late = 0
+        self.repeated = 0
+        self.source = None
+        self._capture_time = 0.0
+
+    def _frame_time(self):
+        return self._capture_time
+
+    def process(self, duration=None):
+        # Runs until the stream ends, duration seconds of stream time have passed,
+        # 'q'/Esc in the display window, or Ctrl+C
+        print(f"Opening stream: {self.input_path}")
+        self.source = LiveSource(self.input_path, self.pace)
+        source = self.source
+        self._setup(source.width, source.height, source.fps)
+        self.motion = ConstantVelocityPredictor()
+        if self.yolo is None:
+            self.yolo = create_detector(self.detector_name, **self.detector_options)
+        # Warm-up call before the stream starts: lazy model setup would otherwise make
+        # the first frames seconds late
+        self.yolo.track(np.zeros((source.height, source.width, 3), dtype=np.uint8))
+        self.yolo.reset()
+        self._allocate_render_buffers(1)
+
+        out = None
+        written = 0
+        if self.output_path:
+            # Written at the nominal rate, one frame per 1/fps slot of capture time
+            out = open_writer(self.output_path, source.fps, (self.target_width, self.target_height),
+                              backend=self.encoder, **self.encoder_options)
+        self.progress = Progress(os.path.basename(self.input_path) or self.input_path)
+        budget = self.scheduler.budget
+        nominal_dt = self.dt
+        start = None
+        last_captured = None
+
+        self.profiler.start()
+        source.start()
+        try:
+            while True:
+                item = source.get()
+                if item is None:
+                    break
+                frame, captured = item
+                age = time.monotonic() - captured
+                if start is None:
+                    start = captured
+                if age > budget:
+                    self.late += 1
+                    continue
+                self.dt = captured - last_captured if last_captured is not None else nominal_dt
+                last_captured = captured
+                self._capture_time = captured - start
+                if out is not None and written:
+                    # Dropped frames' slots repeat the last output frame (still in the
+                    # render buffer), so the clip plays at the speed it was captured
+                    slot = int(round(self._capture_time * source.fps))
+                    while written < slot:
+                        self._write(out, rendered)
+                        written += 1
+                        self.repeated += 1
+
+                if self.scheduler.should_detect(captured, self.dt, age, self.motion.box is not None):
+                    t = time.monotonic()
+                    detection = self.detect_stage(frame)
+                    self.scheduler.record_detection(captured, time.monotonic() - t)
+                else:
+                    detection = frame, self.motion.predict(self.dt), self.target_track_id
+                    self.scheduler.record_prediction()
+
+                t = time.monotonic()
+                rendered = self.render_stage(detection)
+                if out is not None:
+                    self._write(out, rendered)
+                    written += 1
+                else:
+                    self.progress.update(self.frame_idx)
+                quit_requested = False
+                if self.display:
+                    cv2.imshow('SkiAnalyzer live', rendered)
+                    quit_requested = cv2.waitKey(1) & 0xFF in (ord('q'), 27)
+                done = time.monotonic()
+                self.scheduler.record_render(done - t)
+                self.latencies.append(done - captured)
+
+                if quit_requested or (duration and self._capture_time >= duration):
+                    break
+        except KeyboardInterrupt:
+            print("Interrupted")
+        finally:
+            source.close()
+            if out is not None:
+                with self.profiler.stage('encode_flush'):
+                    out.release()
+            if self.display:
+                cv2.destroyAllWindows()
+        if self.profiler.enabled:
+            self.profiler.stop(self.frame_idx)
+            self.profiler.print_summary()
+        self.print_report()
+
+    def report(self):
+        source = self.source
+        latencies = np.asarray(self.latencies) * 1000.0
+        report = {
+            'frames_received': source.frames if source else 0,
+            'frames_output': len(self.latencies),
+            'dropped_superseded': source.superseded if source else 0,
+            'dropped_late': self.late,
+            'repeated_in_output': self.repeated,
+            'detected': self.scheduler.detected,
+            'predicted': self.scheduler.predicted,
+            'forced_detections': self.scheduler.forced,
+            'latency_budget_ms': self.scheduler.budget * 1000.0,
+            'detect_ms': self.scheduler.detect_time * 1000.0,
+            'render_ms': self.scheduler.render_time * 1000.0,
+        }
+        if len(latencies):
+            for p, value in zip(LATENCY_PERCENTILES, np.percentile(latencies, LATENCY_PERCENTILES)):
+                report[f'latency_p{p}_ms'] = float(value)
+            report['latency_max_ms'] = float(latencies.max())
+            report['over_budget'] = float(np.mean(latencies > self.scheduler.budget * 1000.0))
+        return report
+
+    def print_report(self):
+        r = self.report()
+        print(f"Frames: {r['frames_received']} received | {r['frames_output']} output | "
+              f"dropped {r['dropped_superseded']} superseded, {r['dropped_late']} late | "
+              f"{r['repeated_in_output']} repeated in the recording")
+        print(f"Boxes: {r['detected']} detected ({r['forced_detections']} forced) | {r['predicted']} predicted | "
+              f"detect {r['detect_ms']:.1f} ms, render {r['render_ms']:.1f} ms")
+        if 'latency_max_ms' in r:
+            percentiles = ' / '.join(f"{r[f'latency_p{p}_ms']:.0f}" for p in LATENCY_PERCENTILES)
+            print(f"Glass-to-glass latency ms (p{'/p'.join(map(str, LATENCY_PERCENTILES))}/max): "
+                  f"{percentiles} / {r['latency_max_ms']:.0f} | over {r['latency_budget_ms']:.0f} ms budget: "
+                  f"{r['over_budget'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Live zoomed output from a camera, pipe or replayed file within a latency budget')
+    parser.add_argument('source', help="Camera index (e.g. 0), '-' for a stream on stdin, a URL, or a file (replayed in real time)")
+    parser.add_argument('--output', help='Write the zoomed output to this file')
+    parser.add_argument('--display', action='store_true', help="Show the output in a window ('q' or Esc quits)")
+    parser.add_argument('--latency-budget', type=float, default=DEFAULT_LATENCY_BUDGET, help='Seconds from capture to output; older frames are dropped')
+    parser.add_argument('--max-prediction', type=float, default=DEFAULT_MAX_PREDICTION, help='Longest stretch (seconds) the box is predicted without detecting')
+    parser.add_argument('--pace', action=argparse.BooleanOptionalAction, default=None, help='Pace the source to its frame rate (default: only for files)')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds of stream time')
+    parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on zoomed subject')
+    parser.add_argument('--pose-min-height', type=int, default=0, help='Run pose only while the subject is at least this many output pixels tall')
+    parser.add_argument('--pose-interval', type=int, default=1, help='Run pose every N frames, landmarks follow the subject box in between')
+    parser.add_argument('--pose-smoothing', type=float, default=1.0, help='EMA weight of a new pose result (1 = no smoothing)')
+    parser.add_argument('--detector', choices=tracking_detectors(), default='yolov8n', help='Detector backend (ONNX backends need exported weights, see export_detector.py)')
+    parser.add_argument('--model', help='Detector weights (default: the backend\'s yolov8n file in the working directory)')
+    parser.add_argument('--detector-threads', type=int, default=0, help='Detector CPU threads (0 = library default)')
+    parser.add_argument('--roi', action='store_true', help='Detect in a window around the locked skier, with full-frame fallback')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay')
+    parser.add_argument('--encoder', choices=['ffmpeg', 'cv2'], default='ffmpeg')
+    parser.add_argument('--preset', default='ultrafast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor')
+    parser.add_argument('--profile', action='store_true', help='Time every stage (wall/CPU percentiles) and peak memory')
+    parser.add_argument('--report', help='Write the latency/drop report to this JSON file')
+    args = parser.parse_args()
+
+    if not args.output and not args.display:
+        parser.error("Nothing to emit: give --output and/or --display")
+
+    processor = LiveProcessor(args.source, os.path.abspath(args.output) if args.output else None,
+                              latency_budget=args.latency_budget, max_prediction=args.max_prediction,
+                              pace=args.pace, display=args.display,
+                              enable_skeleton=args.skeleton, pose_min_height=args.pose_min_height,
+                              pose_interval=args.pose_interval, pose_smoothing=args.pose_smoothing,
+                              detector_name=args.detector,
+                              detector_options=detector_options(args),
+                              roi=args.roi, debug_overlay=not args.no_overlay,
+                              output_size=parse_output_size(parser, args.output_size),
+                              encoder=args.encoder, encoder_options={'preset': args.preset, 'crf': args.crf},
+                              profile=args.profile)
+    processor.process(duration=args.duration)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(processor.report(), f, indent=2)
+        print(f"Saved report: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,21 @@
 import os
+import time
+
+# Startup timing: everything before processing starts is what a warm model server saves
+_START = time.perf_counter()
+
+from cli_options import detector_options, parse_output_size
+from detectors import tracking_detectors
 from video_processor import VideoProcessor
 
+_IMPORT_TIME = time.perf_counter() - _START
+
+
+def print_timing(models, processing):
+    total = time.perf_counter() - _START
+    print(f"Timing: startup {total - processing:.2f}s (imports {_IMPORT_TIME:.2f}s, models {models:.2f}s) | "
+          f"processing {processing:.2f}s | total {total:.2f}s")
+
 def main():
     # Define paths
     # Assuming running from SkiAnalyzer directory or project root
@@ -13,6 +28,33 @@ def main():
     parser.add_argument('input', nargs='?', help='Path to input video file')
     parser.add_argument('--output', help='Path to output video file')
     parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on zoomed subject')
+    parser.add_argument('--pose-min-height', type=int, default=0, help='Run pose only while the subject is at least this many output pixels tall')
+    parser.add_argument('--pose-interval', type=int, default=1, help='Run pose every N frames, landmarks follow the subject box in between')
+    parser.add_argument('--pose-smoothing', type=float, default=1.0, help='EMA weight of a new pose result (1 = no smoothing)')
+    parser.add_argument('--pipeline', action='store_true', help='Run decode/detect/render/encode as concurrent pipeline stages')
+    parser.add_argument('--queue-size', type=int, default=8, help='Max frames buffered between pipeline stages')
+    parser.add_argument('--cache-dir', help='Detection cache directory: reuse cached detections, or record them on first run')
+    parser.add_argument('--detect-only', action='store_true', help='Only run the detect pass and write the detection cache')
+    parser.add_argument('--max-stride', type=int, default=1, help='Adaptive detection stride: run the detector at most every N frames and predict boxes in between (1 = every frame)')
+    parser.add_argument('--roi', action='store_true', help='Detect in a window around the locked skier, with full-frame fallback')
+    parser.add_argument('--detector', choices=tracking_detectors(), default='yolov8n', help='Detector backend (ONNX backends need exported weights, see export_detector.py)')
+    parser.add_argument('--model', help='Detector weights (default: the backend\'s yolov8n file in the working directory)')
+    parser.add_argument('--detector-threads', type=int, default=0, help='Detector CPU threads (0 = library default)')
+    parser.add_argument('--batch-size', type=int, default=1, help='Frames per YOLO inference call (tracking stays per frame)')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT, e.g. 1920x1080 (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay (detection box and status text)')
+    parser.add_argument('--encoder', choices=['ffmpeg', 'cv2'], default='ffmpeg', help='Output writer: ffmpeg pipe, H.264 with source audio (default), or cv2.VideoWriter mp4v without audio')
+    parser.add_argument('--codec', default='libx264', help='ffmpeg video codec')
+    parser.add_argument('--preset', default='veryfast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor (lower = better quality, bigger files)')
+    parser.add_argument('--encoder-threads', type=int, default=0, help='ffmpeg encoder threads (0 = auto)')
+    parser.add_argument('--checkpoint-dir', help='Checkpoint the run here and resume from it after a crash (output is joined at the end)')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, help='Seconds of video between checkpoints')
+    parser.add_argument('--trajectory', help='Save the per-frame crop trajectory here, for rendering ranges later with render_segment.py')
+    parser.add_argument('--profile', action='store_true', help='Time every stage (wall/CPU percentiles), queue depths and peak memory')
+    parser.add_argument('--profile-report', help='Profile report path, .json or .csv (default: <output>_profile.json)')
+    parser.add_argument('--daemon', action='store_true', help='Run the job on the warm model server (model_server.py), locally if none is running')
+    parser.add_argument('--daemon-address', help='Model server Unix socket path or HOST:PORT (default: per-user socket in the temp directory)')
     args = parser.parse_args()
 
     # Determine input path
@@ -36,10 +78,65 @@ def main():
 
     print(f"Input: {input_video}")
     print(f"Output: {output_video}")
-    print(f"Skeleton Overlay: {'Enabled' if args.skeleton else 'Disabled'}")
+    print(f"Skeleton Overlay: {f'Enabled (every {args.pose_interval} frame(s), min height {args.pose_min_height}px)' if args.skeleton else 'Disabled'}")
+    print(f"Pipeline: {f'Enabled (queue size {args.queue_size})' if args.pipeline else 'Disabled'}")
+    detector_kwargs = detector_options(args)
+    model_path = detector_kwargs.get('model_name')
+    print(f"Detector: {args.detector}{f' ({model_path})' if model_path else ''}")
+    print(f"Inference Batch Size: {args.batch_size}")
+    print(f"ROI Detection: {'Enabled' if args.roi else 'Disabled'}")
+    print(f"Detection Stride: {f'Adaptive (max {args.max_stride})' if args.max_stride > 1 else 'Every frame'}")
+
+    output_size = parse_output_size(parser, args.output_size)
+    print(f"Output Size: {'x'.join(map(str, output_size)) if output_size else 'Source'}")
+    print(f"Encoder: {f'ffmpeg {args.codec} ({args.preset}, crf {args.crf})' if args.encoder == 'ffmpeg' else 'cv2.VideoWriter (mp4v)'}")
+    print(f"Debug Overlay: {'Disabled' if args.no_overlay else 'Enabled'}")
+    print(f"Profiling: {'Enabled' if args.profile else 'Disabled'}")
+    checkpoint_dir = os.path.abspath(args.checkpoint_dir) if args.checkpoint_dir else None
+    print(f"Checkpoints: {f'{checkpoint_dir} (every {args.checkpoint_interval:g}s of video)' if checkpoint_dir else 'Disabled'}")
+
+    cache_dir = args.cache_dir
+    if args.detect_only and not cache_dir:
+        cache_dir = os.path.join(os.path.dirname(input_video), "detection_cache")
+    if cache_dir:
+        cache_dir = os.path.abspath(cache_dir)
+        print(f"Detection Cache: {cache_dir}")
     
-    processor = VideoProcessor(input_video, output_video, enable_skeleton=args.skeleton)
-    processor.process()
+    options = dict(enable_skeleton=args.skeleton, cache_dir=cache_dir,
+                   detector_name=args.detector, detector_options=detector_kwargs,
+                   max_stride=args.max_stride, roi=args.roi,
+                   batch_size=args.batch_size, output_size=output_size,
+                   debug_overlay=not args.no_overlay, encoder=args.encoder,
+                   encoder_options={'codec': args.codec, 'preset': args.preset, 'crf': args.crf,
+                                    'threads': args.encoder_threads},
+                   profile=args.profile, pose_min_height=args.pose_min_height,
+                   pose_interval=args.pose_interval, pose_smoothing=args.pose_smoothing,
+                   checkpoint_dir=checkpoint_dir, checkpoint_interval=args.checkpoint_interval,
+                   trajectory_path=os.path.abspath(args.trajectory) if args.trajectory else None)
+    profile_report = args.profile_report or f"{os.path.splitext(output_video)[0]}_profile.json"
+
+    if args.daemon:
+        import model_server
+        address = model_server.parse_address(args.daemon_address)
+        job = {'input': input_video, 'output': output_video, 'options': options, 'detect_only': args.detect_only,
+               'pipelined': args.pipeline, 'queue_size': args.queue_size, 'profile_report': profile_report}
+        try:
+            timings = model_server.submit(job, address)
+        except ConnectionError as e:
+            print(f"{e}: running locally")
+        else:
+            print_timing(timings['model_load'], timings['process'])
+            return
+
+    start = time.perf_counter()
+    processor = VideoProcessor(input_video, output_video, **options)
+    if args.detect_only:
+        processor.build_detection_cache()
+    else:
+        processor.process(pipelined=args.pipeline, queue_size=args.queue_size)
+        if args.profile:
+            processor.save_profile(profile_report)
+    print_timing(processor.model_load_time, time.perf_counter() - start - processor.model_load_time)
 
 if __name__ == "__main__":
     main()
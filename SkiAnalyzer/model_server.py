@@ -0,0 +1,267 @@
+import argparse
+import contextlib
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import numpy as np
+
+from cli_options import detector_options
+from detectors import create_detector, tracking_detectors
+
+# Warm model server: a long-running local process that keeps detectors and the pose
+# landmarker loaded and warmed up (one inference each), so a CLI call pays for its own
+# frames only, not for importing torch/MediaPipe and loading weights. Jobs are
+# VideoProcessor runs submitted over a local socket (main.py --daemon) and run one at a
+# time; their output lines are streamed back to the client as they are printed.
+# The socket is a Unix socket only the owner can open (127.0.0.1 TCP where there are no
+# Unix sockets), and connections authenticate with a random key that the server writes
+# next to it, readable by the owner only.
+
+if hasattr(socket, 'AF_UNIX') and hasattr(os, 'getuid'):
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), f"skianalyzer-{os.getuid()}.sock")
+else:
+    DEFAULT_ADDRESS = ('127.0.0.1', 47321)
+WARMUP_SIZE = (1280, 720)
+
+
+def key_path(address):
+    if isinstance(address, str):
+        return address + '.key'
+    return os.path.join(tempfile.gettempdir(), f"skianalyzer-{address[1]}.key")
+
+
+def parse_address(text):
+    # 'HOST:PORT' -> TCP, anything else is a Unix socket path
+    if text is None:
+        return DEFAULT_ADDRESS
+    host, sep, port = text.rpartition(':')
+    return (host, int(port)) if sep and port.isdigit() else text
+
+
+def connect(address=DEFAULT_ADDRESS):
+    # Raises ConnectionError when no server is listening at address
+    try:
+        with open(key_path(address), 'rb') as f:
+            key = f.read()
+        return Client(address, authkey=key)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        raise ConnectionError(f"No model server at {address}") from e
+
+
+def request(message, address=DEFAULT_ADDRESS):
+    with connect(address) as conn:
+        conn.send(message)
+        return conn.recv()
+
+
+def submit(job, address=DEFAULT_ADDRESS):
+    # Run a job on the server, printing its output as it arrives; returns its timings
+    with connect(address) as conn:
+        conn.send({'type': 'job', 'job': job})
+        while True:
+            message = conn.recv()
+            if message['type'] == 'log':
+                sys.stdout.write(message['text'])
+                sys.stdout.flush()
+                continue
+            if not message['ok']:
+                raise RuntimeError(f"Job failed on the model server: {message['error']}")
+            return message['timings']
+
+
+class _ConnectionLog:
+    # File-like stdout replacement that sends whole lines to the client. A client
+    # that went away does not stop the job: its output is still written.
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffer = ''
+        self.connected = True
+
+    def write(self, text):
+        self.buffer += text
+        if '\n' in self.buffer:
+            lines, _, self.buffer = self.buffer.rpartition('\n')
+            self._send(lines + '\n')
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self._send(self.buffer)
+            self.buffer = ''
+
+    def _send(self, text):
+        if self.connected:
+            try:
+                self.conn.send({'type': 'log', 'text': text})
+            except OSError:
+                self.connected = False
+
+
+class ModelServer:
+    def __init__(self):
+        self.detectors = {}
+        self.pose = None
+        self.jobs = 0
+        self.start_time = time.perf_counter()
+
+    def detector(self, name, options=None):
+        # (detector, seconds spent loading it now: 0.0 when it was already warm)
+        options = options or {}
+        key = (name, json.dumps(options, sort_keys=True))
+        if key in self.detectors:
+            return self.detectors[key], 0.0
+        start = time.perf_counter()
+        detector = create_detector(name, **options)
+        # Lazy setup (layer fusing, graph optimization, first allocations) happens on the
+        # first inference: do it now, then forget the warm-up frame's tracks
+        detector.track(np.zeros((WARMUP_SIZE[1], WARMUP_SIZE[0], 3), dtype=np.uint8))
+        detector.reset()
+        self.detectors[key] = detector
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {name} in {elapsed:.2f}s")
+        return detector, elapsed
+
+    def pose_estimator(self):
+        if self.pose is not None:
+            return self.pose, 0.0
+        start = time.perf_counter()
+        from pose_estimator import PoseEstimator
+        self.pose = PoseEstimator()
+        self.pose.warm_up()
+        elapsed = time.perf_counter() - start
+        print(f"Loaded pose landmarker in {elapsed:.2f}s")
+        return self.pose, elapsed
+
+    def run(self, job, log):
+        # job: input, output, options (VideoProcessor keyword arguments), pipelined,
+        # queue_size, detect_only, profile_report. Returns timings in seconds.
+        from video_processor import VideoProcessor
+        options = dict(job['options'])
+        detector, model_load = self.detector(options.get('detector_name', 'yolov8n'), options.get('detector_options'))
+        pose = None
+        if options.get('enable_skeleton'):
+            pose, elapsed = self.pose_estimator()
+            model_load += elapsed
+            pose.min_subject_height = options.get('pose_min_height', 0)
+            pose.interval = max(1, options.get('pose_interval', 1))
+            pose.smoothing_alpha = options.get('pose_smoothing', 1.0)
+
+        self.jobs += 1
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            processor = VideoProcessor(job['input'], job['output'], detector=detector, pose_estimator=pose, **options)
+            if job.get('detect_only'):
+                processor.build_detection_cache()
+            else:
+                processor.process(pipelined=job.get('pipelined', False), queue_size=job.get('queue_size', 8))
+                if options.get('profile'):
+                    processor.save_profile(job['profile_report'])
+        log.flush()
+        return {'model_load': model_load, 'process': time.perf_counter() - start}
+
+    def status(self):
+        return {'ok': True, 'jobs': self.jobs, 'uptime': time.perf_counter() - self.start_time,
+                'detectors': [name for name, _ in self.detectors], 'pose': self.pose is not None}
+
+
+def serve(server, address=DEFAULT_ADDRESS):
+    if isinstance(address, str) and os.path.exists(address):
+        try:
+            request({'type': 'status'}, address)
+            raise RuntimeError(f"A model server is already running at {address}")
+        except (ConnectionError, OSError, EOFError):
+            # Left behind by a server that is gone
+            os.remove(address)
+
+    key = os.urandom(32)
+    old_umask = os.umask(0o077)
+    try:
+        listener = Listener(address, authkey=key)
+        fd = os.open(key_path(address), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+    finally:
+        os.umask(old_umask)
+    print(f"Model server listening on {address}")
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError, EOFError):
+                continue
+            with conn:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    continue
+                if message.get('type') == 'status':
+                    conn.send(server.status())
+                elif message.get('type') == 'stop':
+                    conn.send({'ok': True})
+                    break
+                elif message.get('type') == 'job':
+                    job = message['job']
+                    print(f"Job: {job['input']}")
+                    log = _ConnectionLog(conn)
+                    try:
+                        result = {'type': 'done', 'ok': True, 'timings': server.run(job, log)}
+                    except Exception as e:
+                        traceback.print_exc()
+                        result = {'type': 'done', 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                    if log.connected:
+                        try:
+                            conn.send(result)
+                        except OSError:
+                            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(key_path(address))
+    print("Model server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep detector and pose models loaded for fast main.py --daemon runs')
+    parser.add_argument('command', nargs='?', choices=['serve', 'status', 'stop'], default='serve')
+    parser.add_argument('--address', help=f"Unix socket path or HOST:PORT (default: {DEFAULT_ADDRESS})")
+    parser.add_argument('--detector', action='append', choices=tracking_detectors(), help='Detector to load at start (repeatable, default: yolov8n); others load on first use')
+    parser.add_argument('--model', help='Weights for the detector(s) loaded at start')
+    parser.add_argument('--detector-threads', type=int, default=0, help='Detector CPU threads (0 = library default)')
+    parser.add_argument('--skeleton', action='store_true', help='Load the pose landmarker at start')
+    args = parser.parse_args()
+    address = parse_address(args.address)
+
+    if args.command != 'serve':
+        try:
+            reply = request({'type': args.command}, address)
+        except ConnectionError as e:
+            print(e)
+            sys.exit(1)
+        if args.command == 'status':
+            print(f"Model server at {address}: up {reply['uptime']:.0f}s, {reply['jobs']} job(s), "
+                  f"detectors: {', '.join(reply['detectors']) or 'none'}, pose: {'loaded' if reply['pose'] else 'not loaded'}")
+        else:
+            print("Model server stopping")
+        return
+
+    start = time.perf_counter()
+    server = ModelServer()
+    options = detector_options(args)
+    for name in args.detector or ['yolov8n']:
+        server.detector(name, options)
+    if args.skeleton:
+        server.pose_estimator()
+    print(f"Models ready in {time.perf_counter() - start:.2f}s")
+    serve(server, address)
+
+if __name__ == "__main__":
+    main()
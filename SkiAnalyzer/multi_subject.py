@@ -0,0 +1,203 @@
+import argparse
+import os
+
+from cli_options import detector_options, parse_output_size
+from detectors import DEFAULT_CONFIDENCE_THRESHOLD, PERSON_CLASS_ID, select_track, tracking_detectors
+from pipeline import Pipeline
+from profiler import Progress
+from video_processor import VideoProcessor
+from video_writer import open_writer
+
+# Multi-subject output: one decode + detect pass feeds a zoomed render per skier.
+#   - a subject is a ByteTrack track ID, either given up front or picked up on the
+#     fly: the first max_subjects person tracks confirmed for min_track_frames frames
+#   - every subject has its own render-only VideoProcessor (AutoZoom state, output
+#     buffers, pose) and writer; all of them crop the same decoded frame
+#   - a subject's clip starts at the frame its track is taken up (the source audio is
+#     offset to match) and runs to the end of the video, or until the track has been
+#     lost for lost_timeout seconds, which frees the slot for another track
+# Detections are replayed from / recorded to the detection cache as in a single run.
+
+DEFAULT_MAX_SUBJECTS = 4
+DEFAULT_MIN_TRACK_FRAMES = 15
+DEFAULT_LOST_TIMEOUT = 3.0
+
+
+class Subject:
+    def __init__(self, track_id, renderer, writer, start_frame):
+        self.track_id = track_id
+        self.renderer = renderer
+        self.writer = writer
+        self.start_frame = start_frame
+        self.last_seen = start_frame
+        # Stats
+        self.frames = 0
+        self.visible = 0
+
+    @property
+    def output_path(self):
+        return self.renderer.output_path
+
+
+class MultiSubjectProcessor(VideoProcessor):
+    # output_path names the clips: <base>_id<track><ext>
+    def __init__(self, input_path, output_path, track_ids=None, max_subjects=DEFAULT_MAX_SUBJECTS,
+                 min_track_frames=DEFAULT_MIN_TRACK_FRAMES, lost_timeout=DEFAULT_LOST_TIMEOUT, **options):
+        if options.get('max_stride', 1) > 1 or options.get('roi') or options.get('batch_size', 1) > 1:
+            raise ValueError("Multi-subject mode detects every full frame: no stride, ROI or batching")
+        super().__init__(input_path, output_path, **options)
+        self.track_ids = set(track_ids) if track_ids else None
+        self.max_subjects = len(self.track_ids) if self.track_ids else max(1, max_subjects)
+        self.min_track_frames = max(1, min_track_frames)
+        self.lost_timeout = lost_timeout
+        # Renderers get the output/overlay/pose/encoder settings, never the detector
+        self.render_options = {k: v for k, v in options.items()
+                               if k not in ('detector', 'pose_estimator', 'cache_dir', 'profile')}
+        self.subjects = []
+        self.active = []
+        self._taken = set()
+        self._seen = {}
+
+    def _take_up(self, candidates):
+        # Open clips for new tracks: listed IDs on first sight, otherwise once confirmed long enough
+        people = candidates[(candidates['cls'] == PERSON_CLASS_ID) & (candidates['track_id'] >= 0) &
+                            (candidates['conf'] >= DEFAULT_CONFIDENCE_THRESHOLD)]
+        for track_id in people['track_id'].tolist():
+            if track_id in self._taken or len(self.active) >= self.max_subjects:
+                continue
+            if self.track_ids is not None:
+                if track_id in self.track_ids:
+                    self._open_subject(track_id)
+                continue
+            seen = self._seen[track_id] = self._seen.get(track_id, 0) + 1
+            if seen >= self.min_track_frames:
+                self._open_subject(track_id)
+
+    def _open_subject(self, track_id):
+        base, ext = os.path.splitext(self.output_path)
+        path = f"{base}_id{track_id}{ext}"
+        renderer = VideoProcessor(self.input_path, path, **self.render_options)
+        renderer.profiler = self.profiler
+        renderer._setup(self.width, self.height, self.fps)
+        # Pose timestamps continue from the source position
+        renderer.frame_idx = self.frame_idx
+        renderer._allocate_render_buffers(1)
+        writer = open_writer(path, self.fps, (renderer.target_width, renderer.target_height), backend=renderer.encoder,
+                             audio_source=self.input_path, audio_offset=self.frame_idx * self.dt, **renderer.encoder_options)
+        subject = Subject(track_id, renderer, writer, self.frame_idx)
+        self.subjects.append(subject)
+        self.active.append(subject)
+        self._taken.add(track_id)
+        print(f"Subject ID:{track_id} from frame {self.frame_idx}: {path}")
+
+    def _close_subject(self, subject):
+        self.active.remove(subject)
+        with self.profiler.stage('encode_flush'):
+            subject.writer.release()
+
+    def render_subjects(self, detection):
+        # Sink for (frame, candidates): every active subject renders its crop of the frame
+        frame, candidates = detection
+        self._take_up(candidates)
+        lost_frames = self.lost_timeout / self.dt if self.lost_timeout else None
+        for subject in list(self.active):
+            with self.profiler.stage('select'):
+                rect = select_track(candidates, subject.track_id, self.width, self.height)
+            if rect is not None:
+                subject.last_seen = self.frame_idx
+                subject.visible += 1
+            elif lost_frames is not None and self.frame_idx - subject.last_seen > lost_frames:
+                self._close_subject(subject)
+                continue
+            rendered = subject.renderer.render_stage((frame, rect, subject.track_id))
+            with self.profiler.stage('encode'):
+                subject.writer.write(rendered)
+            subject.frames += 1
+        self.frame_idx += 1
+        self.progress.update(self.frame_idx)
+
+    def process(self, pipelined=False, queue_size=8):
+        cap, fps = self._open()
+        if cap is None:
+            return
+        self.fps = fps if fps > 0 else 1.0 / self.dt
+        self.progress = Progress(os.path.basename(self.input_path), self.frame_count)
+        self.profiler.start()
+        try:
+            if pipelined:
+                # decode -> detect run ahead on their own threads; all renders and writes
+                # happen in the sink, so each renderer needs a single output buffer
+                Pipeline(queue_size) \
+                    .add_stage("detect", lambda frame: (frame, self.detect_candidates(frame))) \
+                    .run(self.decode_frames(cap), self.render_subjects)
+            else:
+                for frame in self.decode_frames(cap):
+                    self.render_subjects((frame, self.detect_candidates(frame)))
+            self._save_detections()
+        finally:
+            cap.release()
+            for subject in list(self.active):
+                self._close_subject(subject)
+        print(self.progress.line(self.frame_idx))
+        for subject in self.subjects:
+            share = subject.visible / subject.frames if subject.frames else 0.0
+            print(f"ID:{subject.track_id}: {subject.frames} frames from {subject.start_frame} "
+                  f"(visible {share * 100:.0f}%) -> {subject.output_path}")
+        if not self.subjects:
+            print("No subject was picked up")
+        if self.profiler.enabled:
+            self.profiler.stop(self.frame_idx)
+            self.profiler.print_summary()
+        print("Done!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='One zoomed clip per skier from a single decode/detect pass')
+    parser.add_argument('input', help='Path to input video file')
+    parser.add_argument('--output', help='Output name; clips are <base>_id<track><ext> (default: <input>_processed.mp4)')
+    parser.add_argument('--track-ids', help='Comma separated track IDs to follow (default: pick up tracks automatically)')
+    parser.add_argument('--max-subjects', type=int, default=DEFAULT_MAX_SUBJECTS, help='Clips rendered at the same time')
+    parser.add_argument('--min-track-frames', type=int, default=DEFAULT_MIN_TRACK_FRAMES, help='Frames a track must be confirmed before it gets a clip')
+    parser.add_argument('--lost-timeout', type=float, default=DEFAULT_LOST_TIMEOUT, help='End a clip after its track is lost this many seconds (0 = keep to the end)')
+    parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on each zoomed subject')
+    parser.add_argument('--pose-min-height', type=int, default=0, help='Run pose only while the subject is at least this many output pixels tall')
+    parser.add_argument('--pose-interval', type=int, default=1, help='Run pose every N frames, landmarks follow the subject box in between')
+    parser.add_argument('--pose-smoothing', type=float, default=1.0, help='EMA weight of a new pose result (1 = no smoothing)')
+    parser.add_argument('--detector', choices=tracking_detectors(), default='yolov8n', help='Detector backend (ONNX backends need exported weights, see export_detector.py)')
+    parser.add_argument('--model', help='Detector weights (default: the backend\'s yolov8n file in the working directory)')
+    parser.add_argument('--detector-threads', type=int, default=0, help='Detector CPU threads (0 = library default)')
+    parser.add_argument('--cache-dir', help='Detection cache directory: reuse cached detections, or record them on first run')
+    parser.add_argument('--pipeline', action='store_true', help='Decode and detect ahead of rendering on their own threads')
+    parser.add_argument('--queue-size', type=int, default=8, help='Max frames buffered between pipeline stages')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay')
+    parser.add_argument('--encoder', choices=['ffmpeg', 'cv2'], default='ffmpeg')
+    parser.add_argument('--preset', default='veryfast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor')
+    parser.add_argument('--encoder-threads', type=int, default=0, help='ffmpeg threads per clip (0 = auto)')
+    parser.add_argument('--profile', action='store_true', help='Time every stage (wall/CPU percentiles) and peak memory')
+    args = parser.parse_args()
+
+    input_video = os.path.abspath(args.input)
+    if args.output:
+        output_video = os.path.abspath(args.output)
+    else:
+        base, ext = os.path.splitext(input_video)
+        output_video = f"{base}_processed{ext}"
+    track_ids = [int(v) for v in args.track_ids.split(',') if v.strip()] if args.track_ids else None
+
+    processor = MultiSubjectProcessor(input_video, output_video, track_ids=track_ids, max_subjects=args.max_subjects,
+                                      min_track_frames=args.min_track_frames, lost_timeout=args.lost_timeout,
+                                      enable_skeleton=args.skeleton, pose_min_height=args.pose_min_height,
+                                      pose_interval=args.pose_interval, pose_smoothing=args.pose_smoothing,
+                                      detector_name=args.detector,
+                                      detector_options=detector_options(args),
+                                      cache_dir=os.path.abspath(args.cache_dir) if args.cache_dir else None,
+                                      output_size=parse_output_size(parser, args.output_size),
+                                      debug_overlay=not args.no_overlay, encoder=args.encoder,
+                                      encoder_options={'preset': args.preset, 'crf': args.crf, 'threads': args.encoder_threads},
+                                      profile=args.profile)
+    processor.process(pipelined=args.pipeline, queue_size=args.queue_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import queue
+import threading
+
+# Marks the end of the frame stream as it travels down the queues
+_END = object()
+
+
+class Pipeline:
+    # Runs source -> stage -> ... -> stage -> sink with one worker thread per stage.
+    # Every stage is a single thread fed by a FIFO queue, so items reach each stage
+    # (and the sink) in source order. Queues are bounded: a slow stage blocks the
+    # ones upstream of it (backpressure) instead of letting frames pile up in memory.
+    # OpenCV and torch release the GIL in their heavy calls, so threads are enough to
+    # overlap decode / inference / render / encode.
+    def __init__(self, queue_size=8):
+        self.queue_size = max(1, queue_size)
+        self.stages = []
+        self.queues = []
+        self._abort = threading.Event()
+        self._errors = []
+
+    def add_stage(self, name, fn):
+        self.stages.append((name, fn))
+        return self
+
+    def queue_depths(self):
+        return [q.qsize() for q in self.queues]
+
+    def run(self, source, sink):
+        self.queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._run_source, args=(source, self.queues[0]), name="source", daemon=True)]
+        for i, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._run_stage, args=(fn, self.queues[i], self.queues[i + 1]), name=name, daemon=True))
+        for t in threads:
+            t.start()
+
+        # Sink runs on the calling thread
+        try:
+            while True:
+                item = self._get(self.queues[-1])
+                if item is _END:
+                    break
+                sink(item)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for t in threads:
+                t.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _run_source(self, source, out_q):
+        try:
+            for item in source:
+                if not self._put(out_q, item):
+                    return
+            self._put(out_q, _END)
+        except BaseException as e:
+            self._fail(e)
+
+    def _run_stage(self, fn, in_q, out_q):
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _END:
+                    self._put(out_q, _END)
+                    return
+                if not self._put(out_q, fn(item)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+
+    def _fail(self, e):
+        self._errors.append(e)
+        self._abort.set()
+
+    def _put(self, q, item):
+        # Blocking put that gives up if another stage failed
+        while not self._abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
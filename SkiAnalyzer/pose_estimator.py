@@ -0,0 +1,147 @@
+import cv2
+import numpy as np
+
+# Pose overlay for the zoomed subject, built for full-length runs:
+#   - the landmarker runs in VIDEO mode, so it tracks the pose from the previous
+#     frame instead of running its person detector on every frame
+#   - it runs only while the subject is at least min_subject_height output pixels
+#     tall (below that the landmarks are noise anyway)
+#   - with interval N it runs on every Nth frame. Landmarks are kept relative to the
+#     subject box, so in between they follow the box, and each new result can be
+#     blended in with an EMA (smoothing_alpha < 1) to steady the skeleton
+#   - its input is the rendered frame downscaled to max_input_size (the model itself
+#     works at 256 px), so the RGB conversion touches a small buffer
+# MediaPipe is imported on first use: importing it costs most of a second.
+
+MODEL_PATH = 'pose_landmarker_full.task'
+
+
+def create_landmarker(model_path=MODEL_PATH):
+    from mediapipe.tasks import python as mp_tasks
+    from mediapipe.tasks.python import vision
+    base_options = mp_tasks.BaseOptions(model_asset_path=model_path)
+    options = vision.PoseLandmarkerOptions(
+        base_options=base_options,
+        running_mode=vision.RunningMode.VIDEO,
+        output_segmentation_masks=False
+    )
+    return vision.PoseLandmarker.create_from_options(options)
+
+
+class PoseEstimator:
+    def __init__(self, model_path=MODEL_PATH, min_subject_height=0, interval=1, smoothing_alpha=1.0,
+                 max_input_size=640, landmarker=None):
+        self.landmarker = landmarker or create_landmarker(model_path)
+        self.min_subject_height = min_subject_height
+        self.interval = max(1, interval)
+        self.smoothing_alpha = smoothing_alpha
+        self.max_input_size = max_input_size
+        # VIDEO mode needs strictly increasing timestamps for the lifetime of the landmarker,
+        # also when it is reused for another video (batch workers, segments)
+        self._last_timestamp = -1
+        self._origin = None
+        self._input = None
+        self.reset()
+
+    def reset(self):
+        # New video or segment: landmarks and stats start over, timestamps keep increasing
+        self._relative = None
+        self._since_run = 0
+        # The last run found no pose: the next one waits interval frames
+        self._missed = False
+        self._origin = None
+
+        # Stats
+        self.runs = 0
+        self.frames = 0
+        self.gated = 0
+
+    def warm_up(self, size=(256, 256)):
+        # One landmarker run on a blank frame, so its lazy setup is not paid by the first
+        # real frame. Landmarks and stats start over afterwards.
+        self._detect(np.zeros((size[1], size[0], 3), dtype=np.uint8), 0.0)
+        self.reset()
+
+    def state(self):
+        # Landmarks and counters, for checkpoints. MediaPipe's own tracking state cannot
+        # be saved: after a restore the landmarker starts from a fresh detection.
+        return {'relative': self._relative, 'since_run': self._since_run, 'missed': self._missed,
+                'last_timestamp': self._last_timestamp, 'origin': self._origin,
+                'stats': (self.runs, self.frames, self.gated)}
+
+    def load_state(self, state):
+        self._relative = state['relative']
+        self._since_run = state['since_run']
+        self._missed = state.get('missed', False)
+        self._last_timestamp = state['last_timestamp']
+        self._origin = state['origin']
+        self.runs, self.frames, self.gated = state['stats']
+
+    def _timestamp_ms(self, time_s):
+        t = int(round(time_s * 1000.0))
+        if self._origin is None:
+            self._origin = self._last_timestamp + 1 - t
+        timestamp = max(t + self._origin, self._last_timestamp + 1)
+        self._last_timestamp = timestamp
+        return timestamp
+
+    def _detect(self, image, time_s):
+        # Landmarks (N, 2) normalized to image, or None
+        import mediapipe as mp
+        h, w = image.shape[:2]
+        scale = min(1.0, self.max_input_size / max(h, w))
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if self._input is None or self._input.shape[:2] != (size[1], size[0]):
+            self._input = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        if size == (w, h):
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._input)
+        else:
+            cv2.resize(image, size, dst=self._input, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._input, cv2.COLOR_BGR2RGB, dst=self._input)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=self._input)
+        result = self.landmarker.detect_for_video(mp_image, self._timestamp_ms(time_s))
+        self.runs += 1
+        if not result.pose_landmarks:
+            return None
+        return np.array([(lm.x, lm.y) for lm in result.pose_landmarks[0]], dtype=np.float32)
+
+    def landmarks(self, image, time_s, subject_box):
+        # image: rendered BGR frame; subject_box: (left, top, right, bottom) of the subject
+        # normalized to image, or None. Returns (N, 2) landmarks normalized to image, or None.
+        self.frames += 1
+        if subject_box is None:
+            self._relative = None
+            self._missed = False
+            return None
+        left, top, right, bottom = subject_box
+        bw, bh = max(right - left, 1e-6), max(bottom - top, 1e-6)
+        if bh * image.shape[0] < self.min_subject_height:
+            self.gated += 1
+            self._relative = None
+            self._missed = False
+            return None
+
+        origin = np.array([left, top], dtype=np.float32)
+        extent = np.array([bw, bh], dtype=np.float32)
+        self._since_run += 1
+        # A subject that (re)appears runs at once; after a run without a pose the
+        # landmarker waits interval frames like any other run, not every frame
+        if (self._relative is None and not self._missed) or self._since_run >= self.interval:
+            self._since_run = 0
+            points = self._detect(image, time_s)
+            self._missed = points is None
+            if points is None:
+                self._relative = None
+                return None
+            relative = (points - origin) / extent
+            if self._relative is not None and len(self._relative) == len(relative):
+                a = self.smoothing_alpha
+                relative = a * relative + (1.0 - a) * self._relative
+            self._relative = relative
+        if self._relative is None:
+            return None
+        return origin + self._relative * extent
+
+    def summary(self):
+        ratio = self.runs / self.frames if self.frames else 0.0
+        return f"Pose: {self.runs}/{self.frames} landmarker runs ({ratio * 100:.1f}%), {self.gated} frames below min height"
@@ -0,0 +1,167 @@
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-stage profiling for VideoProcessor. Stages are timed with
+#     with profiler.stage('detect'):
+#         ...
+# recording wall time (perf_counter) and CPU time of the calling thread
+# (thread_time, so pipeline stages on their own threads are measured separately).
+# A disabled profiler hands out one shared no-op context, so the hooks stay in the
+# hot path at the cost of a method call.
+
+_NULL_STAGE = contextlib.nullcontext()
+PERCENTILES = (50, 90, 99)
+
+
+def peak_memory_mb():
+    # Peak resident set size of this process (ru_maxrss: KiB on Linux, bytes on macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+class _StageTimer:
+    __slots__ = ('wall', 'cpu', 'wall_start', 'cpu_start')
+
+    def __init__(self, wall, cpu):
+        self.wall = wall
+        self.cpu = cpu
+
+    def __enter__(self):
+        self.cpu_start = time.thread_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall.append(time.perf_counter() - self.wall_start)
+        self.cpu.append(time.thread_time() - self.cpu_start)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.wall = {}
+        self.cpu = {}
+        self.queues = {}
+        self.frames = 0
+        self.start_time = None
+        self.end_time = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        wall = self.wall.get(name)
+        if wall is None:
+            wall = self.wall[name] = []
+            self.cpu[name] = []
+        return _StageTimer(wall, self.cpu[name])
+
+    def sample_queues(self, names, depths):
+        # One depth sample per queue, e.g. Pipeline.queue_depths() once per written frame
+        if self.enabled:
+            for name, depth in zip(names, depths):
+                self.queues.setdefault(name, []).append(depth)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def stop(self, frames):
+        self.end_time = time.perf_counter()
+        self.frames = frames
+
+    def report(self):
+        elapsed = (self.end_time or time.perf_counter()) - (self.start_time or time.perf_counter())
+        stages = {}
+        for name, wall in self.wall.items():
+            wall_ms = np.asarray(wall) * 1000.0
+            cpu_ms = np.asarray(self.cpu[name]) * 1000.0
+            row = {
+                'calls': len(wall_ms),
+                'wall_total_s': float(wall_ms.sum() / 1000.0),
+                'wall_mean_ms': float(wall_ms.mean()),
+                'wall_max_ms': float(wall_ms.max()),
+                'cpu_total_s': float(cpu_ms.sum() / 1000.0),
+                'cpu_mean_ms': float(cpu_ms.mean()),
+                'share_of_wall': float(wall_ms.sum() / 1000.0 / elapsed) if elapsed > 0 else 0.0,
+            }
+            for p, value in zip(PERCENTILES, np.percentile(wall_ms, PERCENTILES)):
+                row[f'wall_p{p}_ms'] = float(value)
+            stages[name] = row
+        queues = {name: {'mean': float(np.mean(d)), 'max': int(np.max(d))} for name, d in self.queues.items()}
+        return {
+            'frames': self.frames,
+            'wall_time_s': elapsed,
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'process_cpu_s': time.process_time(),
+            'peak_rss_mb': peak_memory_mb(),
+            'stages': stages,
+            'queues': queues,
+        }
+
+    def save(self, path):
+        # .csv: one row per stage; anything else: the full report as JSON
+        report = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                rows = [dict(stage=name, **row) for name, row in report['stages'].items()]
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['stage'])
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+        return report
+
+    def print_summary(self, report=None):
+        report = report or self.report()
+        peak = report['peak_rss_mb']
+        print(f"Profile: {report['frames']} frames in {report['wall_time_s']:.2f}s ({report['fps']:.1f} fps)"
+              f" | Peak RSS: {f'{peak:.0f} MB' if peak is not None else 'n/a'}")
+        print(f"{'stage':>10} | {'calls':>6} | {'mean ms':>8} | {'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | {'cpu ms':>8} | {'share':>6}")
+        for name, s in sorted(report['stages'].items(), key=lambda item: -item[1]['wall_total_s']):
+            print(f"{name:>10} | {s['calls']:>6} | {s['wall_mean_ms']:>8.2f} | {s['wall_p50_ms']:>8.2f} | "
+                  f"{s['wall_p90_ms']:>8.2f} | {s['wall_p99_ms']:>8.2f} | {s['cpu_mean_ms']:>8.2f} | {s['share_of_wall'] * 100:>5.1f}%")
+        for name, q in report['queues'].items():
+            print(f"Queue {name}: mean depth {q['mean']:.1f}, max {q['max']}")
+
+
+class Progress:
+    # Rate-limited progress line: at most one print per interval seconds
+    def __init__(self, label, total=0, interval=2.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.start_time = time.perf_counter()
+        self.next_time = self.start_time + interval
+
+    def update(self, done):
+        now = time.perf_counter()
+        if now < self.next_time:
+            return
+        self.next_time = now + self.interval
+        print(self.line(done, now))
+
+    def line(self, done, now=None):
+        elapsed = (now or time.perf_counter()) - self.start_time
+        fps = done / elapsed if elapsed > 0 else 0.0
+        text = f"{self.label}: frame {done}"
+        if self.total > 0:
+            text += f"/{self.total} ({min(done / self.total, 1.0) * 100:.0f}%)"
+        text += f" | {fps:.1f} fps"
+        if self.total > done and fps > 0:
+            text += f" | ETA {(self.total - done) / fps:.0f}s"
+        return text
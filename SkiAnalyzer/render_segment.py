@@ -0,0 +1,170 @@
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from cli_options import parse_output_size
+from crop_trajectory import CropTrajectory
+from frame_index import FrameIndex
+from util import video_signature
+from video_processor import VideoProcessor
+from video_writer import open_writer
+
+# Random-access rendering: any frame range of a processed video, or single frames as
+# thumbnails, from the crop trajectory its run saved (main.py --trajectory). Nothing
+# is detected and AutoZoom is not replayed; the frame index seeks straight to the
+# range, so a preview costs its own length plus at most one GOP of decoding, wherever
+# it is in the video. Frames match the full run's output (the pose overlay starts
+# tracking afresh at the range start).
+
+
+def parse_time(text):
+    # Seconds as '83.5', '1:23.5' or '0:01:23.5'
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60.0 + float(part)
+    return seconds
+
+
+class SegmentRenderer:
+    # options: VideoProcessor render settings (output_size, debug_overlay, encoder,
+    # encoder_options, enable_skeleton and pose settings)
+    def __init__(self, input_path, trajectory_path, index_path=None, **options):
+        self.input_path = input_path
+        self.trajectory = CropTrajectory.load(trajectory_path)
+        if self.trajectory.source != video_signature(input_path):
+            raise ValueError(f"{trajectory_path} was recorded from another version of {input_path}")
+        self.index = FrameIndex.open(input_path, index_path)
+        # Frames past the trajectory's end were never rendered by its run
+        self.frame_count = min(len(self.index), len(self.trajectory))
+
+        self.processor = VideoProcessor(input_path, None, **options)
+        self.cap, fps = self.processor._open(prepare_detections=False)
+        if self.cap is None:
+            raise RuntimeError(f"Cannot open {input_path}")
+        self.fps = fps if fps > 0 else self.index.fps
+        self.processor._allocate_render_buffers(1)
+        # Frame cap.read() returns next, so nearby requests decode forward instead of seeking
+        self.position = 0
+        # Stats
+        self.seeks = 0
+        self.decoded = 0
+
+    def frame_range(self, start=None, end=None, duration=None):
+        # Seconds -> frames [start, end) clipped to the trajectory
+        first = self.index.frame_at(start) if start is not None else 0
+        if duration is not None:
+            end = (start or 0.0) + duration
+        # Frames shown before end
+        last = int(np.searchsorted(self.index.times, end - 1e-6, side='right')) if end is not None else self.frame_count
+        return first, min(last, self.frame_count)
+
+    def _read(self, frame):
+        # Source frame. Within the current GOP decoding forward is never slower than a seek,
+        # which would restart from the same keyframe.
+        if self.index.keyframe_before(frame) <= self.position <= frame:
+            for _ in range(frame - self.position):
+                self.cap.grab()
+                self.decoded += 1
+            ok, image = self.cap.read()
+            if not ok:
+                raise RuntimeError(f"Cannot read frame {frame}")
+        else:
+            image = self.index.seek(self.cap, frame)
+            self.seeks += 1
+            self.decoded += self.index.seek_cost(frame)
+        self.decoded += 1
+        self.position = frame + 1
+        return image
+
+    def _render(self, frame, image):
+        processor = self.processor
+        # Pose timestamps and the overlay follow the source position
+        processor.frame_idx = frame
+        crop_rect, detected_rect, h_crop, track_id = self.trajectory[frame]
+        return processor.render_frame(image, crop_rect, detected_rect, h_crop, track_id)
+
+    def render(self, output_path, start_frame, end_frame):
+        # Frames [start_frame, end_frame) to a clip with the matching stretch of source audio
+        end_frame = min(end_frame, self.frame_count)
+        if not 0 <= start_frame < end_frame:
+            raise ValueError(f"Empty frame range [{start_frame}, {end_frame}) (video has {self.frame_count} frames)")
+        processor = self.processor
+        if processor.pose is not None:
+            processor.pose.reset()
+        out = open_writer(output_path, self.fps, (processor.target_width, processor.target_height),
+                          backend=processor.encoder, audio_source=self.input_path,
+                          audio_offset=float(self.index.times[start_frame]), **processor.encoder_options)
+        try:
+            for frame in range(start_frame, end_frame):
+                out.write(self._render(frame, self._read(frame)))
+        finally:
+            out.release()
+        return output_path
+
+    def thumbnail(self, frame):
+        # One rendered frame (BGR, a copy: the render buffer is reused)
+        if not 0 <= frame < self.frame_count:
+            raise ValueError(f"Frame {frame} is outside the video ({self.frame_count} frames)")
+        if self.processor.pose is not None:
+            self.processor.pose.reset()
+        return self._render(frame, self._read(frame)).copy()
+
+    def close(self):
+        self.cap.release()
+
+    def summary(self):
+        return f"Seeks: {self.seeks} | Frames decoded: {self.decoded}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render any range of a processed video from its saved crop trajectory')
+    parser.add_argument('input', help='Path to input video file')
+    parser.add_argument('--trajectory', required=True, help='Crop trajectory saved by main.py --trajectory')
+    parser.add_argument('--index', help='Frame index path (default: <input>.frameindex.npz, built on first use)')
+    parser.add_argument('--start', help='Range start, seconds or [H:]M:S (default: beginning)')
+    parser.add_argument('--end', help='Range end, seconds or [H:]M:S (default: end of video)')
+    parser.add_argument('--duration', type=float, help='Range length in seconds (instead of --end)')
+    parser.add_argument('--thumbnails', help='Comma separated times ([H:]M:S) to render as images instead of a clip')
+    parser.add_argument('--output', help='Clip path, or thumbnail directory (default: next to the input)')
+    parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on zoomed subject')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay')
+    parser.add_argument('--encoder', choices=['ffmpeg', 'cv2'], default='ffmpeg')
+    parser.add_argument('--preset', default='veryfast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor')
+    args = parser.parse_args()
+
+    input_video = os.path.abspath(args.input)
+    base, ext = os.path.splitext(input_video)
+    start_time = time.perf_counter()
+    renderer = SegmentRenderer(input_video, os.path.abspath(args.trajectory),
+                               index_path=os.path.abspath(args.index) if args.index else None,
+                               enable_skeleton=args.skeleton, debug_overlay=not args.no_overlay,
+                               output_size=parse_output_size(parser, args.output_size),
+                               encoder=args.encoder, encoder_options={'preset': args.preset, 'crf': args.crf})
+    try:
+        if args.thumbnails:
+            output_dir = os.path.abspath(args.output) if args.output else os.path.dirname(input_video)
+            os.makedirs(output_dir, exist_ok=True)
+            frames = sorted({renderer.index.frame_at(parse_time(t)) for t in args.thumbnails.split(',') if t.strip()})
+            for frame in frames:
+                path = os.path.join(output_dir, f"{os.path.basename(base)}_frame{frame:06d}.jpg")
+                cv2.imwrite(path, renderer.thumbnail(frame))
+                print(f"Frame {frame} ({renderer.index.times[frame]:.2f}s): {path}")
+            rendered = len(frames)
+        else:
+            first, last = renderer.frame_range(parse_time(args.start) if args.start else None,
+                                               parse_time(args.end) if args.end else None, args.duration)
+            output_video = os.path.abspath(args.output) if args.output else f"{base}_preview_{first}-{last}{ext}"
+            renderer.render(output_video, first, last)
+            rendered = last - first
+            print(f"Frames {first}-{last} ({renderer.index.times[first]:.2f}s-{renderer.index.times[last - 1]:.2f}s): {output_video}")
+    finally:
+        renderer.close()
+    print(f"{renderer.summary()} | Rendered: {rendered} | {time.perf_counter() - start_time:.2f}s")
+
+if __name__ == "__main__":
+    main()
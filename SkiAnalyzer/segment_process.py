@@ -0,0 +1,286 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from auto_zoom_manager import Rect
+from checkpoint import seek_frame
+from cli_options import detector_options, parse_output_size
+from crop_trajectory import CropTrajectory
+from detection_cache import DetectionCache
+from detectors import PERSON_CLASS_ID, box_iou, create_detector, detector_config, select_candidate, tracking_detectors
+from util import video_signature
+from video_writer import concat_segments, open_writer
+from zoom_trajectory import solve_trajectory
+
+# Segment-parallel processing of one long video.
+#
+# ByteTrack and AutoZoom are stateful, so the video cannot simply be cut up and
+# rendered independently. Instead:
+#   1. detect (parallel): each segment runs a fresh tracker from `warmup` frames
+#      before its start, so its tracks are established by its first frame
+#   2. hand-off (serial, cheap): target selection is replayed over all segments in
+#      order. In a segment's warm-up frames the candidate best overlapping the
+#      previous segment's target becomes the target, which carries the subject's
+#      identity across the seam. The crop trajectory is then solved once for the
+#      whole video, so zoom state is continuous by construction.
+#   3. render (parallel): each segment renders its frames with the precomputed crops
+#   4. concat: ffmpeg joins the segments without re-encoding (and adds the source audio)
+
+SEAM_MIN_IOU = 0.3
+
+
+def plan_segments(frame_count, segments, warmup):
+    # [(warmup_start, start, end)] covering [0, frame_count)
+    bounds = np.linspace(0, frame_count, segments + 1).astype(int)
+    plan = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            plan.append((int(max(0, start - warmup)), int(start), int(end)))
+    return plan
+
+
+# Worker state: models loaded once per process
+_worker = None
+
+
+def _init_worker(options, threads):
+    global _worker
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker = {'options': options, 'detector': None, 'pose': None}
+
+
+def _detect_segment(input_path, first, end):
+    # Raw tracker candidates of frames [first, end) with a fresh ByteTrack
+    if _worker['detector'] is None:
+        options = _worker['options']
+        _worker['detector'] = create_detector(options.get('detector_name', 'yolov8n'), **(options.get('detector_options') or {}))
+    detector = _worker['detector']
+    detector.reset()
+    cap = cv2.VideoCapture(input_path)
+    out = []
+    try:
+        # Checked seek: a seek that lands on a keyframe would shift the whole segment
+        seek_frame(cap, first)
+        for _ in range(end - first):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.append(detector.track(frame))
+    finally:
+        cap.release()
+    return out
+
+
+def _render_segment(input_path, output_path, start, crops, boxes, valid, heights, track_ids):
+    # Render frames [start, start + len(crops)) with precomputed crops
+    from pose_estimator import PoseEstimator
+    from video_processor import VideoProcessor
+    options = _worker['options']
+    if options.get('enable_skeleton') and _worker['pose'] is None:
+        _worker['pose'] = PoseEstimator(min_subject_height=options.get('pose_min_height', 0),
+                                        interval=options.get('pose_interval', 1),
+                                        smoothing_alpha=options.get('pose_smoothing', 1.0))
+    processor = VideoProcessor(input_path, output_path, pose_estimator=_worker['pose'], **options)
+    cap, fps = processor._open(prepare_detections=False)
+    if cap is None:
+        raise RuntimeError(f"Cannot open {input_path}")
+    try:
+        seek_frame(cap, start)
+    except RuntimeError:
+        cap.release()
+        raise
+    processor.frame_idx = start
+    processor._allocate_render_buffers(1)
+    # Segments are joined by stream copy: no audio here, the concat step adds it
+    out = open_writer(output_path, fps, (processor.target_width, processor.target_height),
+                      backend=processor.encoder, **processor.encoder_options)
+    try:
+        for i in range(len(crops)):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            rect = Rect(*boxes[i]) if valid[i] else None
+            tid = track_ids[i] if track_ids[i] >= 0 else None
+            h_crop = heights[i] if valid[i] else 0.0
+            out.write(processor.render_frame(frame, Rect(*crops[i]), rect, h_crop, tid))
+    finally:
+        cap.release()
+        out.release()
+    return output_path
+
+
+def select_targets(chunks, width, height):
+    # chunks: [(first_frame, [candidates per frame])] in frame order, chunk i
+    # overlapping the end of chunk i - 1 by its warm-up frames.
+    # Returns normalized boxes (frames, 4), valid (frames,), track_ids (frames,)
+    frame_count = max(first + len(c) for first, c in chunks)
+    boxes = np.zeros((frame_count, 4))
+    valid = np.zeros(frame_count, dtype=bool)
+    track_ids = np.full(frame_count, -1, dtype=np.int64)
+    scale = np.array([width, height, width, height], dtype=np.float64)
+
+    covered = 0
+    for first, candidates in chunks:
+        target_track_id = None
+        for local, frame_candidates in enumerate(candidates):
+            f = first + local
+            if f < covered:
+                # Warm-up frame: follow the previous segment's target into this tracker's ids
+                if valid[f]:
+                    people = frame_candidates[(frame_candidates['cls'] == PERSON_CLASS_ID) &
+                                              (frame_candidates['track_id'] >= 0)]
+                    if len(people):
+                        iou = box_iou(people['xyxy'], boxes[f] * scale)
+                        best = int(np.argmax(iou))
+                        if iou[best] >= SEAM_MIN_IOU:
+                            target_track_id = int(people['track_id'][best])
+                continue
+            rect, track_id = select_candidate(frame_candidates, target_track_id, width, height)
+            if track_id is not None:
+                target_track_id = track_id
+            if rect is not None:
+                boxes[f] = rect.left, rect.top, rect.right, rect.bottom
+                valid[f] = True
+            track_ids[f] = -1 if target_track_id is None else target_track_id
+        covered = max(covered, first + len(candidates))
+    return boxes, valid, track_ids
+
+
+def process_segmented(input_path, output_path, segments=None, warmup_seconds=2.0, options=None, work_dir=None,
+                      trajectory_path=None):
+    options = dict(options or {})
+    segments = segments or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // segments)
+
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open {input_path}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    dt = 1.0 / fps if fps > 0 else 1.0 / 30.0
+    seg_len = -(-frame_count // segments)
+    warmup = min(int(round(warmup_seconds / dt)), seg_len)
+    plan = plan_segments(frame_count, segments, warmup)
+    print(f"Frames: {frame_count} | Segments: {len(plan)} | Warm-up: {warmup} frames")
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix='segments_', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.makedirs(work_dir, exist_ok=True)
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=len(plan), initializer=_init_worker, initargs=(options, threads)) as pool:
+            # 1. Detect (a complete detection cache makes this a replay)
+            cache = None
+            if options.get('cache_dir'):
+                config = detector_config(options.get('detector_name', 'yolov8n'), **(options.get('detector_options') or {}))
+                cache_path = DetectionCache.path_for(options['cache_dir'], input_path, config)
+                if os.path.isfile(cache_path):
+                    print(f"Using detection cache: {cache_path}")
+                    cache = DetectionCache.load(cache_path)
+            if cache is not None:
+                chunks = [(0, [cache[i] for i in range(len(cache))])]
+            else:
+                futures = [pool.submit(_detect_segment, input_path, first, end) for first, _, end in plan]
+                chunks = [(first, f.result()) for (first, _, _), f in zip(plan, futures)]
+            detect_time = time.perf_counter()
+
+            # 2. Hand-off: target identity across seams, one crop trajectory for the whole video
+            boxes, valid, track_ids = select_targets(chunks, width, height)
+            frame_count = len(boxes)
+            trajectory = solve_trajectory(boxes, valid, dt)
+            crops = np.stack([trajectory.left, trajectory.top, trajectory.right, trajectory.bottom], axis=1)
+            heights = trajectory.subject_height
+            if trajectory_path:
+                CropTrajectory.from_arrays(width, height, fps, crops, boxes, valid, heights, track_ids,
+                                           video_signature(input_path)).save(trajectory_path)
+                print(f"Saved crop trajectory ({frame_count} frames): {trajectory_path}")
+
+            # 3. Render
+            futures = []
+            segment_paths = []
+            for i, (_, start, end) in enumerate(plan):
+                end = min(end, frame_count)
+                if end <= start:
+                    continue
+                path = os.path.join(work_dir, f"segment_{i:04d}.mp4")
+                segment_paths.append(path)
+                futures.append(pool.submit(_render_segment, input_path, path, start, crops[start:end].tolist(),
+                                           boxes[start:end].tolist(), valid[start:end].tolist(),
+                                           heights[start:end].tolist(), track_ids[start:end].tolist()))
+            for f in futures:
+                f.result()
+            render_time = time.perf_counter()
+
+        # 4. Join
+        concat_segments(segment_paths, output_path, audio_source=input_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    end_time = time.perf_counter()
+    print(f"Detect: {detect_time - start_time:.1f}s | Render: {render_time - detect_time:.1f}s | "
+          f"Join: {end_time - render_time:.1f}s | {frame_count / (end_time - start_time):.1f} fps overall")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ski Video Analyzer: process one long video as parallel segments')
+    parser.add_argument('input', help='Path to input video file')
+    parser.add_argument('--output', help='Path to output video file')
+    parser.add_argument('--segments', type=int, default=None, help='Parallel segments / workers (default: CPU count)')
+    parser.add_argument('--warmup-seconds', type=float, default=2.0, help='Tracker warm-up before each segment start')
+    parser.add_argument('--skeleton', action='store_true', help='Enable MediaPipe skeleton overlay on zoomed subject')
+    parser.add_argument('--pose-min-height', type=int, default=0, help='Run pose only while the subject is at least this many output pixels tall')
+    parser.add_argument('--pose-interval', type=int, default=1, help='Run pose every N frames, landmarks follow the subject box in between')
+    parser.add_argument('--pose-smoothing', type=float, default=1.0, help='EMA weight of a new pose result (1 = no smoothing)')
+    parser.add_argument('--detector', choices=tracking_detectors(), default='yolov8n', help='Detector backend (ONNX backends need exported weights, see export_detector.py)')
+    parser.add_argument('--model', help='Detector weights (default: the backend\'s yolov8n file in the working directory)')
+    parser.add_argument('--detector-threads', type=int, default=1, help='Detector CPU threads per worker (0 = library default)')
+    parser.add_argument('--cache-dir', help='Replay a complete detection cache instead of detecting')
+    parser.add_argument('--output-size', help='Output resolution WIDTHxHEIGHT (default: source resolution)')
+    parser.add_argument('--no-overlay', action='store_true', help='Skip the debug overlay')
+    parser.add_argument('--preset', default='veryfast', help='ffmpeg encoder preset')
+    parser.add_argument('--crf', type=int, default=23, help='ffmpeg constant rate factor')
+    parser.add_argument('--trajectory', help='Save the per-frame crop trajectory here, for rendering ranges later with render_segment.py')
+    args = parser.parse_args()
+
+    input_video = os.path.abspath(args.input)
+    if args.output:
+        output_video = os.path.abspath(args.output)
+    else:
+        base, ext = os.path.splitext(input_video)
+        output_video = f"{base}_processed{ext}"
+
+    options = {
+        'enable_skeleton': args.skeleton,
+        'pose_min_height': args.pose_min_height,
+        'pose_interval': args.pose_interval,
+        'pose_smoothing': args.pose_smoothing,
+        'detector_name': args.detector,
+        'detector_options': detector_options(args),
+        'cache_dir': os.path.abspath(args.cache_dir) if args.cache_dir else None,
+        'output_size': parse_output_size(parser, args.output_size),
+        'debug_overlay': not args.no_overlay,
+        # Segments are joined by stream copy, so every segment uses the same encoder settings
+        'encoder': 'ffmpeg',
+        'encoder_options': {'preset': args.preset, 'crf': args.crf, 'threads': 1},
+    }
+    process_segmented(input_video, output_video, segments=args.segments,
+                      warmup_seconds=args.warmup_seconds, options=options,
+                      trajectory_path=os.path.abspath(args.trajectory) if args.trajectory else None)
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+
+from test_helpers import TEST_DIR, output_hashes, skier_clip, stub_processor
+
+# Batched inference (batch_size > 1) produces the same output as one frame per call.
+# The processor check uses the stub detector. The detector check needs YOLOv8
+# weights: set SKIANALYZER_TEST_MODEL to a .pt file, otherwise it is skipped.
+
+
+def test_batched_processing_matches_per_frame():
+    per_frame = output_hashes(stub_processor('per_frame.mp4'))
+    batched = output_hashes(stub_processor('batched.mp4', batch_size=4))
+    assert len(set(per_frame)) > 1
+    assert batched == per_frame
+
+
+def test_batched_tracking_matches_per_frame():
+    model = os.environ.get('SKIANALYZER_TEST_MODEL')
+    if not model:
+        print("skipped: set SKIANALYZER_TEST_MODEL to YOLOv8 weights to compare track_batch with track")
+        return
+    from detectors import YOLOv8Detector
+    from evaluate_detectors import check_batch
+    from frame_store import FrameStore
+    path, _ = skier_clip()
+    store = FrameStore.open(os.path.join(TEST_DIR, 'frame_store'), path)
+    detector = YOLOv8Detector(model)
+    for batch_size in (4, 8):
+        assert check_batch(store, detector, batch_size) == []
+
+
+if __name__ == "__main__":
+    test_batched_processing_matches_per_frame()
+    test_batched_tracking_matches_per_frame()
+    print("test_batch_tracking: OK")
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import cv2
+
+from test_helpers import CLIP_FRAMES, TEST_DIR, output_hashes, stub_processor
+
+# A checkpointed run that crashes part way and is then resumed produces the same
+# frames as one uninterrupted run, and the joined output holds every frame once.
+
+
+def _frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def test_resume_matches_uninterrupted():
+    reference = output_hashes(stub_processor('uninterrupted.mp4'))
+    assert len(reference) == CLIP_FRAMES
+    with tempfile.TemporaryDirectory(dir=TEST_DIR) as tmp:
+        options = dict(checkpoint_dir=os.path.join(tmp, 'checkpoints'), checkpoint_interval=1.0)
+        interrupted = output_hashes(stub_processor('resumed.mp4', **options), interrupt_after=50)
+        assert len(interrupted) == 50
+        assert os.path.isdir(options['checkpoint_dir'])
+        resumed = output_hashes(stub_processor('resumed.mp4', **options))
+        # The resumed run starts at the last checkpoint, before the crash
+        assert 0 < len(resumed) < CLIP_FRAMES
+        assert interrupted[:CLIP_FRAMES - len(resumed)] + resumed == reference
+        assert not os.path.exists(options['checkpoint_dir'])
+    assert _frame_count(os.path.join(TEST_DIR, 'resumed.mp4')) == CLIP_FRAMES
+
+
+if __name__ == "__main__":
+    test_resume_matches_uninterrupted()
+    print("test_checkpoint: OK")
@@ -0,0 +1,39 @@
+import contextlib
+import io
+import os
+import tempfile
+
+import video_processor
+from test_helpers import TEST_DIR, output_hashes, stub_processor
+
+# Replaying a detection cache renders exactly the frames of the run that detected
+# live, and never loads a detector.
+
+
+def _no_detector(name, **options):
+    raise AssertionError(f"cache replay loaded detector {name}")
+
+
+def test_cache_replay_matches_live_run():
+    live = output_hashes(stub_processor('live.mp4'))
+
+    with tempfile.TemporaryDirectory(dir=TEST_DIR) as cache_dir:
+        builder = stub_processor('unused.mp4', cache_dir=cache_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cache_path = builder.build_detection_cache()
+        assert os.path.isfile(cache_path)
+
+        create_detector = video_processor.create_detector
+        video_processor.create_detector = _no_detector
+        try:
+            replay = stub_processor('replay.mp4', stub=False, cache_dir=cache_dir)
+            replayed = output_hashes(replay)
+        finally:
+            video_processor.create_detector = create_detector
+    assert replay.yolo is None
+    assert replayed == live
+
+
+if __name__ == "__main__":
+    test_cache_replay_matches_live_run()
+    print("test_detection_cache: OK")
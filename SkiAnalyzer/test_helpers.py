@@ -0,0 +1,52 @@
+import contextlib
+import hashlib
+import io
+import os
+import tempfile
+
+from benchmark import StubDetector, make_clip
+from video_processor import VideoProcessor
+
+# Shared by the regression tests (test_*.py next to this file, run with pytest or
+# directly with python): a short synthetic skier clip with its ground-truth boxes,
+# the benchmark's stub detector replaying them, and processor runs that record a
+# hash of every output frame. No model weights or network needed.
+
+TEST_DIR = os.path.join(tempfile.gettempdir(), 'skianalyzer_tests')
+CLIP_SIZE = (640, 360)
+CLIP_FRAMES = 90
+
+
+def skier_clip(frames=CLIP_FRAMES):
+    # (path, boxes): the clip is written once and reused by later runs
+    os.makedirs(TEST_DIR, exist_ok=True)
+    path = os.path.join(TEST_DIR, f"skier_{CLIP_SIZE[0]}x{CLIP_SIZE[1]}_{frames}.mp4")
+    return path, make_clip(path, CLIP_SIZE, frames)
+
+
+def stub_processor(output_name, stub=True, **options):
+    # VideoProcessor on the test clip, with the stub detector unless stub=False
+    path, boxes = skier_clip()
+    return VideoProcessor(path, os.path.join(TEST_DIR, output_name),
+                          detector=StubDetector(boxes) if stub else None, **options)
+
+
+def output_hashes(processor, interrupt_after=None, **process_options):
+    # MD5 of every frame process() writes, in order. interrupt_after=N raises
+    # KeyboardInterrupt once the writer has taken N frames (a crash mid-run).
+    hashes = []
+    write = processor._write
+
+    def record(out, frame, sample_queues=None):
+        hashes.append(hashlib.md5(frame.tobytes()).hexdigest())
+        write(out, frame, sample_queues)
+        if interrupt_after is not None and len(hashes) == interrupt_after:
+            raise KeyboardInterrupt
+    processor._write = record
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            processor.process(**process_options)
+        except KeyboardInterrupt:
+            if interrupt_after is None:
+                raise
+    return hashes
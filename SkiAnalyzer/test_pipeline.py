@@ -0,0 +1,23 @@
+from test_helpers import output_hashes, stub_processor
+
+# Pipelined processing (decode / detect / render / encode threads) writes exactly
+# the frames of a sequential run.
+
+
+def test_pipelined_matches_sequential():
+    sequential = output_hashes(stub_processor('sequential.mp4'))
+    pipelined = output_hashes(stub_processor('pipelined.mp4'), pipelined=True, queue_size=4)
+    assert len(set(sequential)) > 1
+    assert pipelined == sequential
+
+
+def test_pipelined_batches_match_sequential():
+    sequential = output_hashes(stub_processor('sequential.mp4'))
+    pipelined = output_hashes(stub_processor('pipelined_batched.mp4', batch_size=4), pipelined=True, queue_size=2)
+    assert pipelined == sequential
+
+
+if __name__ == "__main__":
+    test_pipelined_matches_sequential()
+    test_pipelined_batches_match_sequential()
+    print("test_pipeline: OK")
@@ -0,0 +1,49 @@
+import numpy as np
+
+from auto_zoom_manager import AutoZoomManager
+from test_helpers import CLIP_SIZE, skier_clip
+from zoom_trajectory import solve_iterative, solve_trajectory
+
+# The whole-trajectory solver reproduces AutoZoomManager stepped frame by frame,
+# for a single configuration and for every row of a batched solve.
+
+ATOL = 1e-9
+
+
+def _clip_boxes():
+    # Normalized ground-truth boxes of the test clip with a few missed detections,
+    # and jittered frame intervals like capture timestamps
+    _, boxes = skier_clip()
+    width, height = CLIP_SIZE
+    boxes = np.asarray(boxes, dtype=np.float64) / [width, height, width, height]
+    valid = np.ones(len(boxes), dtype=bool)
+    valid[[5, 6, 7, 40, 61]] = False
+    dt = 1.0 / 30.0 + np.random.default_rng(0).uniform(-0.004, 0.004, len(boxes))
+    return boxes, valid, dt
+
+
+def _assert_matches(trajectory, reference):
+    np.testing.assert_allclose(trajectory.scale, reference[0], rtol=0, atol=ATOL)
+    np.testing.assert_allclose(trajectory.center_x, reference[1], rtol=0, atol=ATOL)
+    np.testing.assert_allclose(trajectory.center_y, reference[2], rtol=0, atol=ATOL)
+
+
+def test_solver_matches_controller():
+    boxes, valid, dt = _clip_boxes()
+    _assert_matches(solve_trajectory(boxes, valid, dt), solve_iterative(boxes, valid, dt))
+
+
+def test_batched_solver_matches_controller():
+    boxes, valid, dt = _clip_boxes()
+    ratios = np.array([0.1, 0.15, 0.3])
+    k_zoom = np.array([5.0, 10.0, 20.0])
+    trajectories = solve_trajectory(boxes, valid, dt, target_subject_height_ratio=ratios, k_zoom=k_zoom)
+    for i in range(len(ratios)):
+        manager = AutoZoomManager(target_subject_height_ratio=ratios[i], k_zoom=k_zoom[i])
+        _assert_matches(trajectories.config(i), solve_iterative(boxes, valid, dt, manager))
+
+
+if __name__ == "__main__":
+    test_solver_matches_controller()
+    test_batched_solver_matches_controller()
+    print("test_zoom_trajectory: OK")
@@ -0,0 +1,11 @@
+import os
+
+# Small helpers shared by several modules.
+
+
+def video_signature(path):
+    # Size + mtime of an input video: the key that invalidates everything derived from
+    # it (frame index, crop trajectory, checkpoints, batch manifest entries). Cheap
+    # enough to check on every open, unlike hashing the whole video.
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime': int(st.st_mtime)}
@@ -1,39 +1,97 @@
+import os
+import time
+
 import cv2
 import numpy as np
-import mediapipe as mp
-from mediapipe.tasks import python as mp_tasks
-from mediapipe.tasks.python import vision
 
 from auto_zoom_manager import AutoZoomManager, Rect
-from detectors import YOLOv8Detector
+from checkpoint import DEFAULT_CHECKPOINT_INTERVAL, Checkpointer, PartWriter, job_fingerprint
+from crop_trajectory import CropTrajectory
+from detection_cache import DetectionCache
+from detection_stride import AdaptiveStride, ConstantVelocityPredictor
+from detectors import create_detector, detector_config, no_candidates, select_candidate
+from pipeline import Pipeline
+from profiler import Profiler, Progress
+from util import video_signature
+from video_writer import open_writer
 
 class VideoProcessor:
-    def __init__(self, input_path, output_path, enable_skeleton=False):
+    def __init__(self, input_path, output_path, enable_skeleton=False, cache_dir=None, max_stride=1, roi=False, batch_size=1,
+                 output_size=None, debug_overlay=True, encoder='ffmpeg', encoder_options=None,
+                 detector=None, detector_name='yolov8n', detector_options=None, pose_estimator=None, profile=False, pose_min_height=0, pose_interval=1,
+                 pose_smoothing=1.0, checkpoint_dir=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+                 trajectory_path=None):
         self.input_path = input_path
         self.output_path = output_path
         self.enable_skeleton = enable_skeleton
+        # Output (width, height); None keeps the source resolution
+        self.output_size = output_size
+        self.debug_overlay = debug_overlay
+        # Output writer backend ('ffmpeg' or 'cv2') and its codec/preset/crf/threads
+        self.encoder = encoder
+        self.encoder_options = encoder_options or {}
         self.auto_zoom = AutoZoomManager()
-        self.auto_zoom = AutoZoomManager()
-        self.auto_zoom = AutoZoomManager()
-        self.yolo = YOLOv8Detector()
+        # YOLO is loaded on first use: a render pass from the detection cache never needs it.
+        # A detector passed in (batch workers share one across videos) starts with fresh tracks.
+        # Otherwise detector_name picks a registered backend (see detectors.DETECTORS).
+        self.detector_name = detector_name
+        self.detector_options = detector_options or {}
+        self.yolo = detector
+        if self.yolo is not None:
+            self.yolo.reset()
         self.target_track_id = None
 
-        self.landmarker = None
-        if self.enable_skeleton:
-            # Initialize MediaPipe Pose Landmarker
-            model_path = 'pose_landmarker_full.task'
-            base_options = mp_tasks.BaseOptions(model_asset_path=model_path)
-            options = vision.PoseLandmarkerOptions(
-                base_options=base_options,
-                running_mode=vision.RunningMode.IMAGE,
-                output_segmentation_masks=False
-            )
-            self.landmarker = vision.PoseLandmarker.create_from_options(options)
-
-    def draw_landmarks(self, image, detection_result):
-        pose_landmarks_list = detection_result.pose_landmarks
-        if not pose_landmarks_list:
-            return
+        # Detection cache: replayed when present, recorded otherwise
+        self.cache_dir = cache_dir
+        self.cache_path = None
+        self.detection_cache = None
+        self.record_cache = False
+
+        # Adaptive detection stride: detector on keyframes only, predicted boxes in between
+        self.max_stride = max_stride
+        self.stride = None
+        self.motion = None
+
+        # ROI detection around the locked track (last target box in source pixels)
+        self.roi = roi
+        self.last_target_box = None
+
+        # Batched inference: N frames per model call, ByteTrack still applied frame by frame.
+        # Stride and ROI decide per frame from the previous detection, so they run unbatched.
+        if batch_size > 1 and (max_stride > 1 or roi):
+            raise ValueError("batch_size > 1 cannot be combined with detection stride or ROI mode")
+        self.batch_size = max(1, batch_size)
+
+        # Checkpoints every checkpoint_interval seconds of video; a run with the same
+        # checkpoint_dir, input and settings resumes from the last one
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = None
+
+        # Per-frame crops saved here after the run, for rendering ranges later (render_segment.py)
+        self.trajectory_path = trajectory_path
+        self.trajectory = None
+
+        # Per-stage timings (wall/CPU), queue depths and peak memory; no-op unless enabled
+        self.profiler = Profiler(enabled=profile)
+
+        # Seconds spent importing and loading models in this processor (startup cost)
+        self.model_load_time = 0.0
+
+        # MediaPipe Pose in VIDEO mode, gated on the subject's output height (pixels) and
+        # run every pose_interval frames. A shared estimator (batch workers) starts over per video.
+        self.pose = pose_estimator
+        if self.pose is not None:
+            self.pose.reset()
+        elif self.enable_skeleton:
+            start = time.perf_counter()
+            from pose_estimator import PoseEstimator
+            self.pose = PoseEstimator(min_subject_height=pose_min_height, interval=pose_interval,
+                                      smoothing_alpha=pose_smoothing)
+            self.model_load_time += time.perf_counter() - start
+
+    def draw_landmarks(self, image, landmarks):
+        # landmarks: (33, 2) pose landmarks normalized to image
         
         # Connections for the body (subset of full 33 landmarks)
         # 11-12 (shoulders), 11-13 (left arm), 13-15 (left forearm)
@@ -49,68 +107,331 @@ class VideoProcessor:
             (25, 27), (26, 28)
         ]
 
-        for landmarks in pose_landmarks_list:
-            # Draw lines
-            h, w = image.shape[:2]
-            for start_idx, end_idx in connections:
-                if start_idx >= len(landmarks) or end_idx >= len(landmarks):
-                    continue
-                start = landmarks[start_idx]
-                end = landmarks[end_idx]
-                cv2.line(image, (int(start.x * w), int(start.y * h)),(int(end.x * w), int(end.y * h)), (255, 255, 0), 2)
-            
-            # Draw points
-            for idx, landmark in enumerate(landmarks):
-                # Draw only relevant landmarks to reduce clutter
-                if idx in [11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]:
-                     cv2.circle(image, (int(landmark.x * w), int(landmark.y * h)), 4, (0, 255, 0), -1)
-
-    def process(self):
+        # Draw lines
+        h, w = image.shape[:2]
+        for start_idx, end_idx in connections:
+            if start_idx >= len(landmarks) or end_idx >= len(landmarks):
+                continue
+            start = landmarks[start_idx]
+            end = landmarks[end_idx]
+            cv2.line(image, (int(start[0] * w), int(start[1] * h)),(int(end[0] * w), int(end[1] * h)), (255, 255, 0), 2)
+
+        # Draw points
+        for idx, landmark in enumerate(landmarks):
+            # Draw only relevant landmarks to reduce clutter
+            if idx in [11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]:
+                 cv2.circle(image, (int(landmark[0] * w), int(landmark[1] * h)), 4, (0, 255, 0), -1)
+
+    def _open(self, prepare_detections=True):
         print(f"Opening video: {self.input_path}")
         cap = cv2.VideoCapture(self.input_path)
         if not cap.isOpened():
             print("Error opening video.")
-            return
+            return None, None
 
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._setup(width, height, fps)
+        if prepare_detections:
+            self._prepare_detections(fps)
+        return cap, fps
+
+    def _setup(self, width, height, fps):
+        # Per-video state that depends on the source stream
+        self.width = width
+        self.height = height
+        self.target_width, self.target_height = self.output_size or (width, height)
+        self.dt = 1.0 / fps if fps > 0 else 1.0 / 30.0
+        self.frame_idx = 0
+        self.detect_idx = 0
+        if self.trajectory_path:
+            self.trajectory = CropTrajectory(width, height, fps, video_signature(self.input_path))
+        if self.max_stride > 1:
+            self.stride = AdaptiveStride(max_stride=self.max_stride)
+            self.motion = ConstantVelocityPredictor()
+
+    def _prepare_detections(self, fps):
+        self.detection_cache = None
+        self.record_cache = False
+        if self.cache_dir:
+            config = detector_config(self.detector_name, roi=self.roi, **self.detector_options)
+            self.cache_path = DetectionCache.path_for(self.cache_dir, self.input_path, config)
+            if os.path.isfile(self.cache_path):
+                print(f"Using detection cache: {self.cache_path}")
+                self.detection_cache = DetectionCache.load(self.cache_path)
+                return
+            if self.stride is None:
+                self.detection_cache = DetectionCache(self.width, self.height, fps, config)
+                self.record_cache = True
+            else:
+                # A strided run only sees keyframes, which would leave holes in the cache
+                print("Detection stride enabled: not recording a detection cache")
+        if self.yolo is None:
+            start = time.perf_counter()
+            self.yolo = create_detector(self.detector_name, **self.detector_options)
+            self.model_load_time += time.perf_counter() - start
+
+    def _save_detections(self):
+        if self.record_cache:
+            self.detection_cache.save(self.cache_path)
+            print(f"Saved detection cache ({len(self.detection_cache)} frames): {self.cache_path}")
+
+    def _save_trajectory(self):
+        if self.trajectory is not None:
+            self.trajectory.save(self.trajectory_path)
+            print(f"Saved crop trajectory ({len(self.trajectory)} frames): {self.trajectory_path}")
+
+    def build_detection_cache(self):
+        # Detect pass only: run the tracker over every frame and store the raw candidates
+        if not self.cache_dir:
+            raise ValueError("build_detection_cache needs a cache_dir")
+        cap, _ = self._open()
+        if cap is None:
+            return None
+        try:
+            if self.record_cache:
+                progress = Progress(os.path.basename(self.input_path), self.frame_count)
+                if self.batch_size > 1:
+                    for frames in self.decode_batches(cap):
+                        self.detect_batch_stage(frames)
+                        progress.update(self.detect_idx)
+                else:
+                    for frame in self.decode_frames(cap):
+                        self.detect_stage(frame)
+                        progress.update(self.detect_idx)
+                self._save_detections()
+        finally:
+            cap.release()
+        return self.cache_path
+
+    def process(self, pipelined=False, queue_size=8):
+        cap, fps = self._open()
+        if cap is None:
+            return
+
+        in_flight = (queue_size + 2) * self.batch_size if pipelined else 1
+        self._allocate_render_buffers(in_flight)
+
+        size = (self.target_width, self.target_height)
+        if self.checkpoint_dir:
+            # Output goes to parts in the checkpoint directory, joined when the run completes
+            self.checkpoints = Checkpointer(self.checkpoint_dir, self.checkpoint_interval / self.dt, job_fingerprint(self))
+            start, parts = self.checkpoints.resume(self, cap)
+            out = PartWriter(self.checkpoint_dir, fps, size, self.encoder, self.encoder_options, parts, start)
+        else:
+            out = open_writer(self.output_path, fps, size, backend=self.encoder,
+                              audio_source=self.input_path, **self.encoder_options)
+        self.progress = Progress(os.path.basename(self.input_path), self.frame_count)
+        self.profiler.start()
+
+        try:
+            if pipelined:
+                pipeline = Pipeline(queue_size)
+                # Queue depths are sampled whenever a frame reaches the encoder
+                if self.profiler.enabled:
+                    def sample_queues():
+                        self.profiler.sample_queues(['decode->detect', 'detect->render', 'render->encode'],
+                                                    pipeline.queue_depths())
+                else:
+                    sample_queues = None
+            if pipelined and self.batch_size > 1:
+                # Same pipeline with a batch of frames travelling as one item
+                pipeline \
+                    .add_stage("detect", self.detect_batch_stage) \
+                    .add_stage("render", lambda detections: [self.render_stage(d) for d in detections]) \
+                    .run(self.decode_batches(cap), lambda frames: self._write_all(out, frames, sample_queues))
+            elif pipelined:
+                # decode -> detect -> zoom/render -> encode, each on its own thread.
+                # Detect and zoom/render are single threads, so tracker and AutoZoom
+                # updates still happen in frame order.
+                pipeline \
+                    .add_stage("detect", self.detect_stage) \
+                    .add_stage("render", self.render_stage) \
+                    .run(self.decode_frames(cap), lambda frame: self._write(out, frame, sample_queues))
+            elif self.batch_size > 1:
+                for frames in self.decode_batches(cap):
+                    for detection in self.detect_batch_stage(frames):
+                        self._write(out, self.render_stage(detection))
+            else:
+                for frame in self.decode_frames(cap):
+                    self._write(out, self.render_stage(self.detect_stage(frame)))
+            self._save_detections()
+            self._save_trajectory()
+            if self.stride is not None:
+                print(self.stride.summary(self.dt))
+            if self.pose is not None:
+                print(self.pose.summary())
+            if self.roi and self.yolo is not None:
+                print(f"ROI passes: {self.yolo.roi_passes} | Full-frame passes: {self.yolo.full_passes}")
+        finally:
+            cap.release()
+            # Flushing the encoder: frames still buffered in ffmpeg / the pipe
+            with self.profiler.stage('encode_flush'):
+                out.release()
+        if self.checkpoints is not None:
+            self.checkpoints.finish(out, self.output_path, self.input_path)
+            print(self.checkpoints.summary())
+        print(self.progress.line(self.frame_idx))
+        if self.profiler.enabled:
+            self.profiler.stop(self.frame_idx)
+            self.profiler.print_summary()
+        print("Done!")
+
+    def save_profile(self, path):
+        report = self.profiler.save(path)
+        print(f"Saved profile: {path}")
+        return report
 
-        target_width = width
-        target_height = height
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(self.output_path, fourcc, fps, (target_width, target_height))
+    def _write(self, out, frame, sample_queues=None):
+        with self.profiler.stage('encode'):
+            out.write(frame)
+        if self.checkpoints is not None:
+            self.checkpoints.written(self, out)
+        if sample_queues is not None:
+            sample_queues()
+        self.progress.update(self.frame_idx)
 
-        frame_idx = 0
+    def _write_all(self, out, frames, sample_queues=None):
+        for frame in frames:
+            self._write(out, frame, sample_queues)
+
+    def decode_frames(self, cap):
         while cap.isOpened():
-            ret, frame = cap.read()
+            with self.profiler.stage('decode'):
+                ret, frame = cap.read()
             if not ret:
                 break
+            yield frame
 
-            # 1. Detect skier using YOLOv8
-            # Pass target_track_id for ByteTrack ID matching
-            detected_rect, track_id = self.yolo.detect(frame, target_track_id=self.target_track_id)
-            
-            # Update tracking state
-            if track_id is not None:
-                # If we found a track (either re-acquired or new), latch onto it
-                # Logic: If we didn't have a target, this is the new one (closest to center).
-                # If we had a target and found it, great.
-                # If we had a target and lost it, detect() might return None or a new closest track.
-                # Here we strictly follow what detect() returns.
-                self.target_track_id = track_id
-
-            # Draw detection (green) if present
-            if detected_rect:
-                p_left = int(detected_rect.left * width)
-                p_top = int(detected_rect.top * height)
-                p_right = int(detected_rect.right * width)
-                p_bottom = int(detected_rect.bottom * height)
-                cv2.rectangle(frame, (p_left, p_top), (p_right, p_bottom), (0, 255, 0), 2)
-
-            # 2. AutoZoom logic
-            dt = 1.0 / fps if fps > 0 else 1.0 / 30.0
+    def decode_batches(self, cap):
+        batch = []
+        for frame in self.decode_frames(cap):
+            batch.append(frame)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def detect_stage(self, frame):
+        if self.stride is not None and not self.stride.next_frame():
+            # Between keyframes: extrapolate the last detections, keep the tracker idle
+            self.detect_idx += 1
+            detection = frame, self.motion.predict(self.dt), self.target_track_id
+        else:
+            detection = self._select(frame, self.detect_candidates(frame))
+        if self.checkpoints is not None:
+            self.checkpoints.detected(self)
+        return detection
+
+    def detect_candidates(self, frame):
+        # 1. Detect skier using YOLOv8 (or replay its candidates from the cache)
+        with self.profiler.stage('detect'):
+            if self.record_cache or self.detection_cache is None:
+                if self.roi:
+                    candidates = self.yolo.track_roi(frame, self.last_target_box, self.target_track_id)
+                else:
+                    candidates = self.yolo.track(frame)
+                if self.record_cache:
+                    self.detection_cache.append(candidates)
+            else:
+                candidates = self.detection_cache[self.detect_idx] if self.detect_idx < len(self.detection_cache) else no_candidates()
+        self.detect_idx += 1
+        return candidates
+
+    def detect_batch_stage(self, frames):
+        # detect_stage for a list of frames: one model call, then selection frame by frame
+        # (profiled as one 'detect' call per batch)
+        with self.profiler.stage('detect'):
+            if self.record_cache or self.detection_cache is None:
+                batch_candidates = self.yolo.track_batch(frames)
+                if self.record_cache:
+                    for candidates in batch_candidates:
+                        self.detection_cache.append(candidates)
+            else:
+                n = len(self.detection_cache)
+                batch_candidates = [self.detection_cache[i] if i < n else no_candidates() for i in range(self.detect_idx, self.detect_idx + len(frames))]
+        self.detect_idx += len(frames)
+        detections = [self._select(frame, candidates) for frame, candidates in zip(frames, batch_candidates)]
+        if self.checkpoints is not None:
+            self.checkpoints.detected(self)
+        return detections
+
+    def _select(self, frame, candidates):
+        # Pass target_track_id for ByteTrack ID matching
+        with self.profiler.stage('select'):
+            detected_rect, track_id = select_candidate(candidates, self.target_track_id, self.width, self.height)
+
+        # Update tracking state
+        if track_id is not None:
+            # If we found a track (either re-acquired or new), latch onto it
+            # Logic: If we didn't have a target, this is the new one (closest to center).
+            # If we had a target and found it, great.
+            # If we had a target and lost it, detect() might return None or a new closest track.
+            # Here we strictly follow what detect() returns.
+            self.target_track_id = track_id
+        if detected_rect:
+            self.last_target_box = (detected_rect.left * self.width, detected_rect.top * self.height,
+                                    detected_rect.right * self.width, detected_rect.bottom * self.height)
+        else:
+            self.last_target_box = None
+
+        if self.motion is not None:
+            residual = self.motion.correct(detected_rect, self.dt)
+            if self.stride is not None:
+                self.stride.update(residual, self.motion.speed)
+
+        # Carry the track ID with the frame: in pipelined mode this stage runs ahead of rendering
+        return frame, detected_rect, self.target_track_id
+
+    def detect_state(self):
+        # What detection and selection carry from one frame to the next (checkpoints)
+        tracking = self.yolo is not None and (self.record_cache or self.detection_cache is None)
+        return {'detect_idx': self.detect_idx, 'target_track_id': self.target_track_id,
+                'last_target_box': self.last_target_box, 'stride': self.stride, 'motion': self.motion,
+                'tracker': self.yolo.tracker_state() if tracking else None}
+
+    def load_detect_state(self, state):
+        self.detect_idx = state['detect_idx']
+        self.target_track_id = state['target_track_id']
+        self.last_target_box = state['last_target_box']
+        self.stride = state['stride']
+        self.motion = state['motion']
+        if state['tracker'] is not None:
+            self.yolo.load_tracker_state(state['tracker'])
+
+    def render_state(self):
+        # What AutoZoom and pose carry from one frame to the next (checkpoints)
+        return {'frame_idx': self.frame_idx, 'auto_zoom': self.auto_zoom,
+                'pose': self.pose.state() if self.pose is not None else None, 'trajectory': self.trajectory}
+
+    def load_render_state(self, state):
+        self.frame_idx = state['frame_idx']
+        self.auto_zoom = state['auto_zoom']
+        if state['pose'] is not None and self.pose is not None:
+            self.pose.load_state(state['pose'])
+        if self.trajectory is not None:
+            # Frames before the checkpoint come from the interrupted run, if it recorded them
+            self.trajectory = state['trajectory']
+            if self.trajectory is None:
+                print("Checkpoint has no crop trajectory: not saving one for this run")
+
+    def _allocate_render_buffers(self, count):
+        # Output frames are written into a ring of reused buffers. In pipelined mode a
+        # rendered frame can still sit in the encode queue, so the ring covers every
+        # frame that can be in flight downstream of the render stage.
+        shape = (self.target_height, self.target_width, 3)
+        self._out_buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(1, count))]
+        self._out_idx = 0
+
+    def render_stage(self, detection):
+        frame, detected_rect, target_track_id = detection
+
+        # 2. AutoZoom logic
+        with self.profiler.stage('zoom'):
+            dt = self.dt
             current_zoom = self.auto_zoom.current_zoom_scale
             scaled_input_rect = None
             if detected_rect:
@@ -129,49 +450,81 @@ class VideoProcessor:
                 # Freeze when no detection
                 crop_rect_norm = self.auto_zoom.update(Rect(0, 0, 0, 0), 0)
 
-            # 3. Render cropped region
-            c_left = int(crop_rect_norm.left * width)
-            c_top = int(crop_rect_norm.top * height)
-            c_right = int(crop_rect_norm.right * width)
-            c_bottom = int(crop_rect_norm.bottom * height)
-            c_left = max(0, c_left)
-            c_top = max(0, c_top)
-            c_right = min(width, c_right)
-            c_bottom = min(height, c_bottom)
-            if c_right <= c_left:
-                c_right = c_left + 1
-            if c_bottom <= c_top:
-                c_bottom = c_top + 1
-            
-            crop_img = frame[c_top:c_bottom, c_left:c_right]
-            
-            if crop_img.size != 0:
-                 if self.enable_skeleton and self.landmarker:
-                     # 4. Run MediaPipe Pose on the zoomed (cropped) image
-                     mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(crop_img, cv2.COLOR_BGR2RGB))
-                     detection_result = self.landmarker.detect(mp_image)
-                     self.draw_landmarks(crop_img, detection_result)
-                 
-                 resized = cv2.resize(crop_img, (target_width, target_height))
-            else:
-                 resized = cv2.resize(frame, (target_width, target_height))
+        h_crop = scaled_input_rect.height if scaled_input_rect else 0.0
+        return self.render_frame(frame, crop_rect_norm, detected_rect, h_crop, target_track_id)
+
+    def render_frame(self, frame, crop_rect_norm, detected_rect, h_crop, target_track_id):
+        # Crop + scale + overlays for one frame whose crop is already decided (by the
+        # AutoZoom step in render_stage, or a precomputed zoom trajectory)
+        width, height = self.width, self.height
+        target_width, target_height = self.target_width, self.target_height
+
+        # 3. Render cropped region: the crop is a view of the frame, scaled in one
+        # resize straight into a reused output buffer
+        c_left = int(crop_rect_norm.left * width)
+        c_top = int(crop_rect_norm.top * height)
+        c_right = int(crop_rect_norm.right * width)
+        c_bottom = int(crop_rect_norm.bottom * height)
+        c_left = min(max(0, c_left), width - 1)
+        c_top = min(max(0, c_top), height - 1)
+        c_right = min(width, c_right)
+        c_bottom = min(height, c_bottom)
+        if c_right <= c_left:
+            c_right = c_left + 1
+        if c_bottom <= c_top:
+            c_bottom = c_top + 1
+
+        resized = self._out_buffers[self._out_idx]
+        self._out_idx = (self._out_idx + 1) % len(self._out_buffers)
+        with self.profiler.stage('render'):
+            cv2.resize(frame[c_top:c_bottom, c_left:c_right], (target_width, target_height), dst=resized)
+        if self.trajectory is not None:
+            self.trajectory.append(crop_rect_norm, detected_rect, h_crop, target_track_id)
+
+        if self.enable_skeleton and self.pose:
+            # 4. Run MediaPipe Pose on the zoomed image
+            with self.profiler.stage('pose'):
+                subject_box = None
+                if detected_rect:
+                    cw, ch = c_right - c_left, c_bottom - c_top
+                    subject_box = ((detected_rect.left * width - c_left) / cw, (detected_rect.top * height - c_top) / ch,
+                                   (detected_rect.right * width - c_left) / cw, (detected_rect.bottom * height - c_top) / ch)
+                landmarks = self.pose.landmarks(resized, self._frame_time(), subject_box)
+                if landmarks is not None:
+                    self.draw_landmarks(resized, landmarks)
 
-            # Debug overlay
+        # Debug overlay
+        if self.debug_overlay:
+            self._draw_overlay(resized, crop_rect_norm, detected_rect, h_crop, target_track_id,
+                               (c_left, c_top, c_right, c_bottom))
+
+        self.frame_idx += 1
+        if self.checkpoints is not None:
+            self.checkpoints.rendered(self)
+        return resized
+
+    def _frame_time(self):
+        # Stream time (seconds) of the frame being rendered
+        return self.frame_idx * self.dt
+
+    def _draw_overlay(self, resized, crop_rect_norm, detected_rect, h_crop, target_track_id, crop_px):
+        with self.profiler.stage('overlay'):
+            width, height = self.width, self.height
+            target_width, target_height = self.target_width, self.target_height
+            c_left, c_top, c_right, c_bottom = crop_px
             h_orig = detected_rect.height if detected_rect else 0.0
-            h_crop = scaled_input_rect.height if scaled_input_rect else 0.0
-            zoom_lvl = 1.0 / self.auto_zoom.current_zoom_scale
+            zoom_lvl = 1.0 / crop_rect_norm.width
             algo_str = "YOLO+MP" if self.enable_skeleton else "YOLOv8"
-            tid_str = f"ID:{self.target_track_id}" if self.target_track_id is not None else "No ID"
+            tid_str = f"ID:{target_track_id}" if target_track_id is not None else "No ID"
             debug_text = f"{algo_str} | {tid_str} | Orig H: {h_orig:.3f} | Crop H: {h_crop:.3f} (Target: {self.auto_zoom.target_subject_height_ratio}) | Zoom: {zoom_lvl:.2f}x"
+            # Draw detection (green) if present, mapped into the output frame
+            if detected_rect:
+                sx = target_width / (c_right - c_left)
+                sy = target_height / (c_bottom - c_top)
+                p_left = int((detected_rect.left * width - c_left) * sx)
+                p_top = int((detected_rect.top * height - c_top) * sy)
+                p_right = int((detected_rect.right * width - c_left) * sx)
+                p_bottom = int((detected_rect.bottom * height - c_top) * sy)
+                cv2.rectangle(resized, (p_left, p_top), (p_right, p_bottom), (0, 255, 0), 2)
             cv2.rectangle(resized, (10, 10), (900, 60), (0, 0, 0), -1)
             cv2.putText(resized, debug_text, (20, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-            print(f"Frame {frame_idx}: {debug_text}")
-
-            out.write(resized)
-            frame_idx += 1
-            if frame_idx % 30 == 0:
-                pass
-
-        cap.release()
-        out.release()
-        print("Done!")
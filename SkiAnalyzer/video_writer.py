@@ -0,0 +1,173 @@
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Output writers. Both take BGR uint8 frames through write(frame) and finish with
+# release(), the cv2.VideoWriter interface:
+#   FFmpegWriter streams raw frames over a pipe to an ffmpeg process (x264/x265,
+#     preset/CRF/threads) and muxes the source audio back in. ffmpeg encodes in its
+#     own process, so encoding overlaps decode/detect/render.
+#   cv2.VideoWriter with mp4v, the fallback when no ffmpeg binary is available.
+# ffmpeg is the default backend of VideoProcessor and every CLI (it used to be
+# cv2.VideoWriter): outputs are H.264 with the source audio instead of silent mp4v.
+# Pass encoder='cv2' / --encoder cv2 for the old output.
+
+DEFAULT_ENCODER_OPTIONS = {
+    'codec': 'libx264',
+    'preset': 'veryfast',
+    'crf': 23,
+    'threads': 0,  # 0 = ffmpeg picks
+}
+
+
+def find_ffmpeg():
+    # FFMPEG_BINARY if set, else ffmpeg on PATH, else the binary bundled with imageio-ffmpeg if installed
+    path = os.environ.get('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+
+class FFmpegWriter:
+    def __init__(self, path, fps, size, codec='libx264', preset='veryfast', crf=23, threads=0,
+                 audio_source=None, audio_offset=0.0, ffmpeg=None):
+        self.path = path
+        self.size = size
+        ffmpeg = ffmpeg or find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg not found (install it or set FFMPEG_BINARY)")
+
+        width, height = size
+        cmd = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps}', '-i', 'pipe:0']
+        if audio_source:
+            # Optional mapping: sources without audio still encode. audio_offset (seconds)
+            # aligns the audio with output that starts later than the source.
+            if audio_offset > 0:
+                cmd += ['-ss', f'{audio_offset:.3f}']
+            cmd += ['-i', audio_source, '-map', '0:v:0', '-map', '1:a:0?', '-c:a', 'copy', '-shortest']
+        cmd += ['-c:v', codec, '-preset', preset, '-crf', str(crf), '-threads', str(threads),
+                # yuv420p needs even dimensions
+                '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', '-movflags', '+faststart', path]
+        # stderr goes to a file, not a pipe: nothing reads a pipe until release(), and
+        # ffmpeg blocks once it fills, stalling the frame writes
+        self.stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self.stderr)
+
+    def isOpened(self):
+        return self.proc.poll() is None
+
+    def write(self, frame):
+        # The pipe write copies the frame out, so the caller can reuse its buffer right away
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.release()
+
+    def release(self):
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self.proc.wait() != 0:
+            self.stderr.seek(0)
+            stderr = self.stderr.read().decode('utf-8', 'replace')
+            raise RuntimeError(f"ffmpeg failed ({self.proc.returncode}) writing {self.path}: {stderr.strip()}")
+        self.stderr.close()
+
+
+def open_writer(path, fps, size, backend='ffmpeg', audio_source=None, audio_offset=0.0, **options):
+    # 'ffmpeg' falls back to cv2.VideoWriter (mp4v) when no ffmpeg binary is found
+    if backend == 'ffmpeg':
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is not None:
+            return FFmpegWriter(path, fps, size, audio_source=audio_source, audio_offset=audio_offset, ffmpeg=ffmpeg,
+                                **dict(DEFAULT_ENCODER_OPTIONS, **options))
+        print("ffmpeg not found, falling back to cv2.VideoWriter (mp4v, no audio)")
+    elif backend != 'cv2':
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(path, fourcc, fps, size)
+
+
+# Joins parts encoded with the same settings by stream copy (segments, checkpoint parts)
+def concat_segments(segment_paths, output_path, audio_source=None):
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("Joining segments needs ffmpeg (install it or set FFMPEG_BINARY)")
+    list_path = output_path + '.segments.txt'
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_source:
+        cmd += ['-i', audio_source, '-map', '0:v:0', '-map', '1:a:0?', '-shortest']
+    cmd += ['-c', 'copy', '-movflags', '+faststart', output_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg concat failed: {e.stderr.decode('utf-8', 'replace').strip()}") from e
+    finally:
+        os.remove(list_path)
+
+
+def synthetic_frames(count, size, seed=0):
+    # Moving gradient + noise: compressible like footage, not a flat colour
+    width, height = size
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = rng.integers(0, 24, (height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        base = ((x + y + 4 * i) % 256).astype(np.uint8)
+        frame = np.dstack([base, base[:, ::-1], np.flipud(base)])
+        cv2.add(frame, noise, dst=frame)
+        cv2.circle(frame, ((40 + 8 * i) % width, height // 2), height // 10, (255, 255, 255), -1)
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encoder benchmark: encode fps and output size per backend')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--size', default='1920x1080', help='WIDTHxHEIGHT')
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--out-dir', default='encoder_benchmark')
+    parser.add_argument('--preset', action='append', help='x264 preset(s) to compare (default: veryfast)')
+    parser.add_argument('--crf', type=int, default=23)
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    frames = list(synthetic_frames(args.frames, size))
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    runs = [('cv2', {})]
+    if find_ffmpeg():
+        runs += [('ffmpeg', {'preset': p, 'crf': args.crf}) for p in (args.preset or ['veryfast'])]
+    else:
+        print("ffmpeg not found: benchmarking cv2.VideoWriter only")
+
+    for backend, options in runs:
+        label = backend + (f"-{options['preset']}" if options else '')
+        path = os.path.join(args.out_dir, f"{label}.mp4")
+        start = time.perf_counter()
+        writer = open_writer(path, args.fps, size, backend=backend, **options)
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>16}: {len(frames) / elapsed:7.1f} fps | {os.path.getsize(path) / 1e6:7.2f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from detection_cache import DetectionCache
+from detectors import select_candidate
+from zoom_trajectory import DEFAULT_PARAMS, solve_trajectory
+
+# AutoZoom parameter sweep: every configuration of a grid is solved against one
+# recorded detection sequence (no decoding, no inference) and scored on framing.
+# Configurations are split into chunks, each chunk is one batched solve_trajectory
+# call, and the chunks are spread over a process pool.
+
+# Score = sum(weight * metric), lower is better
+DEFAULT_WEIGHTS = {
+    'height_error': 1.0,
+    'jitter': 0.01,
+    'out_of_frame': 5.0,
+}
+
+
+def detection_boxes(cache):
+    # Replay target selection over a DetectionCache -> (frames, 4) normalized boxes + valid mask
+    n = len(cache)
+    boxes = np.zeros((n, 4))
+    valid = np.zeros(n, dtype=bool)
+    target_track_id = None
+    for i in range(n):
+        rect, track_id = select_candidate(cache[i], target_track_id, cache.width, cache.height)
+        if track_id is not None:
+            target_track_id = track_id
+        if rect is not None:
+            boxes[i] = rect.left, rect.top, rect.right, rect.bottom
+            valid[i] = True
+    return boxes, valid
+
+
+def expand_grid(grid):
+    # {'k_zoom': [5, 10], 'smoothing_alpha': [0.1, 0.2]} -> list of 4 config dicts
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown AutoZoom parameters: {sorted(unknown)}")
+    names = sorted(grid)
+    values = [[float(v) for v in np.atleast_1d(grid[name])] for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def score_trajectory(trajectory, boxes, valid, dt, target_subject_height_ratio):
+    # Framing metrics of a (possibly batched) trajectory, each of shape (configs,) or ()
+    #   height_error: mean |subject height in rendered crop - target| / target over detected frames
+    #   jitter: RMS crop acceleration (center x/y and scale, normalized units / s^2)
+    #   out_of_frame: fraction of detected frames where the subject box is not fully inside the crop
+    target = np.asarray(target_subject_height_ratio, dtype=np.float64)[..., None]
+    scale = trajectory.scale
+    n_valid = max(int(valid.sum()), 1)
+
+    rendered_height = (boxes[:, 3] - boxes[:, 1]) / scale
+    height_error = np.where(valid, np.abs(rendered_height - target) / target, 0.0).sum(axis=-1) / n_valid
+
+    if len(trajectory) >= 3:
+        accel = np.stack([np.diff(v, n=2, axis=-1) for v in (trajectory.center_x, trajectory.center_y, scale)])
+        jitter = np.sqrt(np.mean(accel ** 2, axis=(0, -1))) / (dt * dt)
+    else:
+        jitter = np.zeros(scale.shape[:-1])
+
+    inside = ((boxes[:, 0] >= trajectory.left) & (boxes[:, 2] <= trajectory.right) &
+              (boxes[:, 1] >= trajectory.top) & (boxes[:, 3] <= trajectory.bottom))
+    out_of_frame = (valid & ~inside).sum(axis=-1) / n_valid
+
+    return {'height_error': height_error, 'jitter': jitter, 'out_of_frame': out_of_frame}
+
+
+# Worker state: the detection sequence is shipped once per process, not once per chunk
+_worker_data = None
+
+
+def _init_worker(boxes, valid, dt, smoothing):
+    global _worker_data
+    _worker_data = (boxes, valid, dt, smoothing)
+
+
+def _evaluate_chunk(configs):
+    boxes, valid, dt, smoothing = _worker_data
+    if smoothing == 'prefiltered':
+        # Box pre-smoothing takes one alpha per solve: group the chunk by alpha
+        groups = {}
+        for i, c in enumerate(configs):
+            groups.setdefault(c.get('smoothing_alpha', DEFAULT_PARAMS['smoothing_alpha']), []).append(i)
+    else:
+        groups = {None: list(range(len(configs)))}
+
+    out = [None] * len(configs)
+    for alpha, idx in groups.items():
+        params = {name: np.array([configs[i].get(name, DEFAULT_PARAMS[name]) for i in idx], dtype=np.float64)
+                  for name in DEFAULT_PARAMS}
+        if alpha is not None:
+            params['smoothing_alpha'] = alpha
+        trajectory = solve_trajectory(boxes, valid, dt, smoothing=smoothing, **params)
+        metrics = score_trajectory(trajectory, boxes, valid, dt, params['target_subject_height_ratio'])
+        for j, i in enumerate(idx):
+            out[i] = {name: float(values[j]) for name, values in metrics.items()}
+    return out
+
+
+def sweep(boxes, valid, dt, grid, weights=None, workers=None, chunk_size=256, smoothing='causal'):
+    # Evaluate every configuration of grid; returns rows sorted by score (best first)
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    configs = expand_grid(grid) if isinstance(grid, dict) else list(grid)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    valid = np.asarray(valid, dtype=bool).reshape(-1)
+    chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(boxes, valid, dt, smoothing)
+        results = [_evaluate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(boxes, valid, dt, smoothing)) as pool:
+            results = list(pool.map(_evaluate_chunk, chunks))
+
+    rows = []
+    for config, metrics in zip(configs, itertools.chain.from_iterable(results)):
+        row = dict(DEFAULT_PARAMS, **config)
+        row.update(metrics)
+        row['score'] = sum(weights[name] * metrics[name] for name in weights)
+        rows.append(row)
+    rows.sort(key=lambda r: r['score'])
+    return rows
+
+
+def parse_param(text):
+    # "k_zoom=5,10,20" or "k_zoom=2:20:10" (start:stop:count, inclusive)
+    name, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"Expected name=values, got {text!r}")
+    if ':' in values:
+        start, stop, count = values.split(':')
+        return name, np.linspace(float(start), float(stop), int(count)).tolist()
+    return name, [float(v) for v in values.split(',')]
+
+
+def print_table(rows, top):
+    columns = list(DEFAULT_PARAMS) + list(DEFAULT_WEIGHTS) + ['score']
+    print(' | '.join(f"{c:>12.12}" for c in ['rank'] + columns))
+    for rank, row in enumerate(rows[:top], 1):
+        print(' | '.join([f"{rank:>12}"] + [f"{row[c]:>12.4f}" for c in columns]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AutoZoom parameter sweep over a recorded detection cache')
+    parser.add_argument('cache', help='Detection cache (.npz) recorded with --cache-dir / --detect-only')
+    parser.add_argument('--param', action='append', type=parse_param, default=[],
+                        help='Swept parameter, e.g. k_zoom=5,10,20 or smoothing_alpha=0.05:0.5:10 (repeatable)')
+    parser.add_argument('--grid', help='JSON file with {parameter: [values]} (merged with --param)')
+    parser.add_argument('--weight', action='append', type=parse_param, default=[],
+                        help='Score weight override, e.g. jitter=0.1')
+    parser.add_argument('--smoothing', choices=['causal', 'prefiltered'], default='causal',
+                        help="'prefiltered' smooths the boxes forward-backward before the (still causal) controller")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Configurations per batched solve')
+    parser.add_argument('--top', type=int, default=20, help='Rows to print')
+    parser.add_argument('--csv', help='Write the full ranked table to this CSV file')
+    args = parser.parse_args()
+
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    grid.update(dict(args.param))
+    weights = {name: values[0] for name, values in args.weight}
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        parser.error(f"Unknown score weights: {sorted(unknown)}")
+
+    cache = DetectionCache.load(args.cache)
+    boxes, valid = detection_boxes(cache)
+    dt = 1.0 / cache.fps if cache.fps > 0 else 1.0 / 30.0
+    print(f"Frames: {len(boxes)} ({int(valid.sum())} with a subject)")
+
+    rows = sweep(boxes, valid, dt, grid, weights=weights, workers=args.workers,
+                 chunk_size=args.chunk_size, smoothing=args.smoothing)
+    print(f"Configurations: {len(rows)}")
+    print_table(rows, args.top)
+
+    if args.csv:
+        os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved: {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import numpy as np
+
+from auto_zoom_manager import AutoZoomManager
+
+# Offline AutoZoom: the whole crop trajectory for a clip from per-frame subject boxes.
+#
+# Replays exactly what VideoProcessor does per frame (map the full-frame box into
+# the current crop, AutoZoomManager.update, freeze on missing detections) but on
+# plain floats / arrays instead of Rect and SmoothingFilter objects.
+#
+# The controller is a feedback loop (the smoother input is the box relative to the
+# previous crop), so frames have to be stepped in order. What is vectorized is the
+# configuration axis: pass any parameter as an array of C values and all C
+# trajectories are solved in the same pass, one array op per step. A single
+# configuration takes the scalar path. It is still a Python loop over frames: one
+# configuration over an hour of 60 fps takes about 0.65 s, 256 about 13 s.
+
+DEFAULT_PARAMS = {
+    'target_subject_height_ratio': 0.15,
+    'k_zoom': 10.0,
+    'smoothing_alpha': 0.2,
+    'min_zoom_scale': 0.05,
+    'max_zoom_scale': 1.0,
+}
+
+
+class ZoomTrajectory:
+    # scale / center_x / center_y: crop after each frame, shape (frames,) or (configs, frames)
+    # subject_height: subject height as seen in the crop the frame was rendered from
+    # (the controller input, NaN where there was no detection)
+    def __init__(self, scale, center_x, center_y, subject_height):
+        self.scale = scale
+        self.center_x = center_x
+        self.center_y = center_y
+        self.subject_height = subject_height
+
+    def __len__(self):
+        return self.scale.shape[-1]
+
+    @property
+    def left(self):
+        return self.center_x - self.scale / 2.0
+
+    @property
+    def top(self):
+        return self.center_y - self.scale / 2.0
+
+    @property
+    def right(self):
+        return self.center_x + self.scale / 2.0
+
+    @property
+    def bottom(self):
+        return self.center_y + self.scale / 2.0
+
+    def config(self, i):
+        # One configuration out of a batched solve
+        if self.scale.ndim == 1:
+            return self
+        return ZoomTrajectory(self.scale[i], self.center_x[i], self.center_y[i], self.subject_height[i])
+
+
+def zero_phase_smooth(values, valid, alpha):
+    # Forward-backward EMA over the valid frames: no lag, offline only
+    out = np.array(values, dtype=np.float64, copy=True)
+    idx = np.flatnonzero(valid)
+    if len(idx) == 0:
+        return out
+    seq = out[idx]
+    for order in (slice(None), slice(None, None, -1)):
+        view = seq[order]
+        acc = view[0]
+        for i in range(len(view)):
+            acc = alpha * view[i] + (1.0 - alpha) * acc
+            view[i] = acc
+    out[idx] = seq
+    return out
+
+
+def solve_trajectory(boxes, valid, dt, smoothing='causal', **params):
+    # boxes: (frames, 4) normalized full-frame left, top, right, bottom of the subject
+    # valid: (frames,) bool, False where there was no detection (box ignored)
+    # dt: seconds per frame, scalar or (frames,) for real timestamps
+    # smoothing: 'causal' matches AutoZoomManager; 'prefiltered' first smooths the
+    #   full-frame boxes forward-backward (zero-phase). The causal in-loop EMA still
+    #   runs after that, so the trajectory lags less than 'causal' but is not
+    #   zero-phase: panning maps the in-crop center straight to the crop center, and
+    #   without the EMA that feedback oscillates once zoomed in
+    # params: DEFAULT_PARAMS overrides, each a scalar or an array of configurations
+    p = dict(DEFAULT_PARAMS)
+    unknown = set(params) - set(p)
+    if unknown:
+        raise ValueError(f"Unknown AutoZoom parameters: {sorted(unknown)}")
+    p.update(params)
+
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    valid = np.asarray(valid, dtype=bool).reshape(-1)
+    n = len(boxes)
+    dts = np.broadcast_to(np.asarray(dt, dtype=np.float64), (n,))
+    # AutoZoomManager.update(..., dt <= 0) leaves the state untouched, same as a missing box
+    active = valid & (dts > 0)
+
+    if smoothing == 'prefiltered':
+        if np.ndim(p['smoothing_alpha']) > 0:
+            raise ValueError("prefiltered smoothing takes a single smoothing_alpha")
+        boxes = np.stack([zero_phase_smooth(boxes[:, i], active, p['smoothing_alpha']) for i in range(4)], axis=1)
+    elif smoothing != 'causal':
+        raise ValueError(f"Unknown smoothing mode: {smoothing}")
+
+    batched = any(np.ndim(v) > 0 for v in p.values())
+    if batched:
+        p = {k: np.asarray(v, dtype=np.float64) for k, v in p.items()}
+        shape = np.broadcast_shapes(*(v.shape for v in p.values()))
+        p = {k: np.broadcast_to(v, shape) for k, v in p.items()}
+        return _solve(boxes, active, dts, p, np.ones(shape), _clamp_array, np.empty)
+    p = {k: float(v) for k, v in p.items()}
+    return _solve(boxes.tolist(), active.tolist(), dts.tolist(), p, 1.0, _clamp_scalar, None)
+
+
+def solve_like(manager, boxes, valid, dt, smoothing='causal'):
+    # Solve with the configuration of an existing AutoZoomManager
+    return solve_trajectory(boxes, valid, dt, smoothing=smoothing,
+                            target_subject_height_ratio=manager.target_subject_height_ratio,
+                            k_zoom=manager.k_zoom,
+                            smoothing_alpha=manager.height_smoother.alpha,
+                            min_zoom_scale=manager.min_zoom_scale,
+                            max_zoom_scale=manager.max_zoom_scale)
+
+
+def _clamp_scalar(val, min_val, max_val):
+    return max(min_val, min(max_val, val))
+
+
+def _clamp_array(val, min_val, max_val):
+    return np.maximum(min_val, np.minimum(max_val, val))
+
+
+def _solve(boxes, active, dts, p, ones, clamp, empty):
+    n = len(boxes)
+    target = p['target_subject_height_ratio']
+    k_zoom = p['k_zoom']
+    alpha = p['smoothing_alpha']
+    min_scale = p['min_zoom_scale']
+    max_scale = p['max_zoom_scale']
+
+    # AutoZoomManager initial state
+    scale = ones * 1.0
+    ccx = ones * 0.5
+    ccy = ones * 0.5
+    sh = scx = scy = None
+
+    if empty is None:
+        out_scale, out_cx, out_cy, out_h = [0.0] * n, [0.0] * n, [0.0] * n, [float('nan')] * n
+    else:
+        shape = np.shape(ones) + (n,)
+        out_scale, out_cx, out_cy = empty(shape), empty(shape), empty(shape)
+        out_h = np.full(shape, np.nan)
+
+    for i in range(n):
+        if active[i]:
+            left, top, right, bottom = boxes[i]
+            dt = dts[i]
+
+            # Full-frame box -> box inside the current crop (VideoProcessor.render_stage)
+            crop_l = ccx - scale / 2
+            crop_t = ccy - scale / 2
+            l_new = (left - crop_l) / scale
+            t_new = (top - crop_t) / scale
+            r_new = (right - crop_l) / scale
+            b_new = (bottom - crop_t) / scale
+            height = b_new - t_new
+            center_x = (l_new + r_new) / 2.0
+            center_y = (t_new + b_new) / 2.0
+
+            # 1. Smooth Input (SmoothingFilter: first sample initializes)
+            if sh is None:
+                sh, scx, scy = height, center_x, center_y
+            else:
+                sh = (alpha * height) + ((1.0 - alpha) * sh)
+                scx = (alpha * center_x) + ((1.0 - alpha) * scx)
+                scy = (alpha * center_y) + ((1.0 - alpha) * scy)
+
+            # 3. Zoom Logic
+            zoom_error = target - sh
+            scale = scale + (-zoom_error * k_zoom * dt)
+            scale = clamp(scale, min_scale, max_scale)
+
+            # 4. Proportional Panning + Clamp Center
+            half_scale = scale / 2.0
+            ccx = clamp(scx, half_scale, 1.0 - half_scale)
+            ccy = clamp(scy, half_scale, 1.0 - half_scale)
+
+            if empty is None:
+                out_h[i] = height
+            else:
+                out_h[..., i] = height
+
+        if empty is None:
+            out_scale[i], out_cx[i], out_cy[i] = scale, ccx, ccy
+        else:
+            out_scale[..., i], out_cx[..., i], out_cy[..., i] = scale, ccx, ccy
+
+    if empty is None:
+        return ZoomTrajectory(np.array(out_scale), np.array(out_cx), np.array(out_cy), np.array(out_h))
+    return ZoomTrajectory(out_scale, out_cx, out_cy, out_h)
+
+
+def solve_iterative(boxes, valid, dt, manager=None):
+    # Reference: the same clip stepped through AutoZoomManager itself (slow)
+    from auto_zoom_manager import Rect
+    manager = manager or AutoZoomManager()
+    n = len(boxes)
+    dts = np.broadcast_to(np.asarray(dt, dtype=np.float64), (n,))
+    out = np.empty((3, n))
+    for i, (box, ok) in enumerate(zip(np.asarray(boxes, dtype=np.float64).tolist(), valid)):
+        if ok:
+            scale = manager.current_zoom_scale
+            crop_l = manager.current_crop_center_x - scale / 2
+            crop_t = manager.current_crop_center_y - scale / 2
+            rect = Rect((box[0] - crop_l) / scale, (box[1] - crop_t) / scale,
+                        (box[2] - crop_l) / scale, (box[3] - crop_t) / scale)
+            manager.update(rect, float(dts[i]))
+        else:
+            manager.update(Rect(0, 0, 0, 0), 0)
+        out[:, i] = manager.current_zoom_scale, manager.current_crop_center_x, manager.current_crop_center_y
+    return out